@@ -0,0 +1,104 @@
+"""Memory benchmark of the catalog held by the addon.
+
+The full catalog of the "all" country is loaded from the fake Orange API into a fresh profile, then read back from the
+catalog store and turned into directory items the way the podcast routes do. The Python memory and the number of
+memory blocks still allocated while every radio, podcast, radio grouping and show record is held are measured with
+tracemalloc and sys.getallocatedblocks, along with the peak memory of the initial load, and written as JSON.
+
+Usage: python benchmarks/catalog.py [--radios N] [--podcasts N] [--shows N] [--output FILE]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from fake_api import FakeOrangeAPI
+from invoke import EndpointPatcher, use_addon_modules
+
+
+def measure(api: FakeOrangeAPI, profile: str) -> dict:
+    """Load the catalog, then measure the memory held by its records and directory items."""
+    os.environ["BENCH_PROFILE"] = profile
+    use_addon_modules()
+    sys.meta_path.insert(0, EndpointPatcher(api.url))
+
+    from lib.providers.orange import OrangeProvider
+    from lib.utils.kodi import set_addon_setting
+
+    set_addon_setting("orange.country", "all")
+    provider = OrangeProvider()
+
+    tracemalloc.start()
+    provider.get_catchup_items([])
+    provider.get_streams()
+    _, load_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    dataset = "podcasts:all"
+    podcast_radios = provider.get_catchup_items([])
+    radio_slugs = [podcast_radio.radio_slug or "other" for podcast_radio in podcast_radios]
+    first_podcast_slug = provider.catalog.get_podcasts(dataset, limit=1)[0].slug
+    provider.get_catchup_items(["other", first_podcast_slug])
+
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    memory, _ = tracemalloc.get_traced_memory()
+
+    held = {
+        "radios": provider.catalog.get_radios("radios:all"),
+        "podcasts": provider.catalog.get_podcasts(dataset),
+        "podcast_groups": provider.catalog.get_podcast_groups(dataset),
+        "shows": provider.catalog.get_shows(first_podcast_slug),
+        "items": [provider.get_catchup_items([radio_slug]) for radio_slug in radio_slugs],
+    }
+
+    gc.collect()
+    held_memory = tracemalloc.get_traced_memory()[0] - memory
+    held_blocks = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+
+    return {
+        "load_peak_memory": load_peak,
+        "held_memory": held_memory,
+        "held_blocks": held_blocks,
+        "records": sum(len(records) for name, records in held.items() if name != "items"),
+        "directory_items": sum(len(items) for items in held["items"]),
+    }
+
+
+def main() -> None:
+    """Parse arguments, run the benchmark and report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--radios", type=int, default=300)
+    parser.add_argument("--podcasts", type=int, default=3000)
+    parser.add_argument("--shows", type=int, default=500)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    api = FakeOrangeAPI(args.radios, args.podcasts, args.shows, latency=0).start()
+
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            result = measure(api, profile)
+    finally:
+        api.stop()
+
+    print(
+        f"load peak {result['load_peak_memory'] / 1024:.0f} KiB"
+        f" | held {result['held_memory'] / 1024:.0f} KiB in {result['held_blocks']} blocks"
+        f" for {result['records']} records and {result['directory_items']} directory items",
+        file=sys.stderr,
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
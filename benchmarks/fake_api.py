@@ -0,0 +1,243 @@
+"""Local stand-in for the Orange radio API, serving responses shaped like the real ones."""
+
+import json
+import random
+import re
+import struct
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeOrangeAPI:
+    """Serve browse, podcast, show, stream, program, token and logo responses of configurable size and latency.
+
+    Logos are served by the fake API itself, as 512x512 PNG images of a few colors, so that many logo URLs share the
+    same content like on the real API. Faults can be injected: a ratio of responses delayed by slow_latency, and a
+    ratio of requests failing with 503 Service Unavailable, drawn from a seeded generator so that runs are comparable.
+    """
+
+    def __init__(
+        self,
+        radios: int = 300,
+        podcasts: int = 3000,
+        shows: int = 500,
+        latency: float = 0.05,
+        slow_ratio: float = 0,
+        slow_latency: float = 1,
+        error_ratio: float = 0,
+        seed: int = 0,
+    ):
+        """Initialize Fake Orange API object."""
+        self.radios = radios
+        self.podcasts = podcasts
+        self.shows = shows
+        self.latency = latency
+        self.slow_ratio = slow_ratio
+        self.slow_latency = slow_latency
+        self.error_ratio = error_ratio
+        self._random = random.Random(seed)
+        self.request_count = 0
+        self.bytes_sent = 0
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeOrangeAPI":
+        """Start serving in a background thread."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_stats(self) -> None:
+        """Reset request and byte counters."""
+        with self._lock:
+            self.request_count = 0
+            self.bytes_sent = 0
+
+    def respond(self, path: str, query: dict) -> object:
+        """Build the response body of a request."""
+        if path == "/token.php":
+            return json.dumps({"access_token": "fake-token", "expires_in": 3600})
+
+        if re.fullmatch(r"/api/browsing/radios/.*", path):
+            return self._paginate([self._radio(i) for i in range(self.radios)], query)
+
+        if re.fullmatch(r"/api/browsing/podcasts/.*", path):
+            return self._paginate([self._podcast(i) for i in range(self.podcasts)], query)
+
+        match = re.fullmatch(r"/api/radios/([^/]+)/podcasts", path)
+        if match:
+            podcasts = [self._podcast(i) for i in range(self.podcasts) if f"radio-{i % self.radios}" == match.group(1)]
+            return self._paginate(podcasts, query)
+
+        match = re.fullmatch(r"/api/podcasts/([^/]+)/shows", path)
+        if match:
+            return self._paginate([self._show(match.group(1), i) for i in range(self.shows)], query)
+
+        match = re.fullmatch(r"/api/(radios|shows)/([^/]+)/streams", path)
+        if match:
+            return {"result": self._streams(match.group(2))}
+
+        match = re.fullmatch(r"/api/radios/([^/]+)/programs", path)
+        if match:
+            return {"result": self._programs(match.group(1), query.get("date", ["1970-01-01"])[0])}
+
+        match = re.fullmatch(r"/static/.*?(\d*)/logo_large\.png", path)
+        if match:
+            return _png(512, 512, int(match.group(1) or 0) % 8)
+
+        return None
+
+    def _handler(self) -> type:
+        """Build the request handler class bound to this server."""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                url = urlsplit(self.path)
+                body = api.respond(url.path, parse_qs(url.query))
+                slow, failing = api._draw_faults()
+                time.sleep(api.slow_latency if slow else api.latency)
+
+                if failing:
+                    error = json.dumps({"error": "Service Unavailable", "detail": "x" * 1024}).encode()
+                    self.send_response(503)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(error)))
+                    self.end_headers()
+                    self.wfile.write(error)
+                    return
+
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                is_image = isinstance(body, bytes)
+                payload = body if is_image else json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png" if is_image else "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+                with api._lock:
+                    api.request_count += 1
+                    api.bytes_sent += len(payload)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
+
+    def _draw_faults(self) -> tuple:
+        """Draw whether the current response is slow and whether it fails."""
+        with self._lock:
+            return self._random.random() < self.slow_ratio, self._random.random() < self.error_ratio
+
+    def _paginate(self, items: list, query: dict) -> dict:
+        """Return the requested page of items."""
+        size = int(query.get("size", ["20"])[0])
+        page = int(query.get("page", ["1"])[0])
+        return {"result": items[(page - 1) * size : page * size], "paginate": {"count": len(items)}}
+
+    def _radio(self, index: int) -> dict:
+        """Build a radio record."""
+        return {
+            "id": index,
+            "slug": f"radio-{index}",
+            "name": f"Radio Été {index}",
+            "description": "Lorem ipsum dolor sit amet " * 8,
+            "url_logo_large": f"{self.url}/static/radios/{index}/logo_large.png",
+            "url_logo_small": f"{self.url}/static/radios/{index}/logo_small.png",
+            "country": "fr",
+            "genres": ["news", "music"],
+        }
+
+    def _podcast(self, index: int) -> dict:
+        """Build a podcast record."""
+        radio = index % self.radios
+        has_radio = index % 10 != 0
+        return {
+            "id": index,
+            "slug": f"podcast-{index}",
+            "name": f"Podcast Café {index}",
+            "description": "Lorem ipsum dolor sit amet " * 8,
+            "url_logo_large": f"{self.url}/static/podcasts/{index}/logo_large.png",
+            "radio_permalink": f"https://radio.orange.com/radios/radio-{radio}" if has_radio else "",
+            "radio_name": f"Radio Été {radio}" if has_radio else "",
+            "radio_url_logo_large": f"{self.url}/static/radios/{radio}/logo_large.png" if has_radio else "",
+        }
+
+    def _show(self, podcast_slug: str, index: int) -> dict:
+        """Build a show record."""
+        return {
+            "id": index,
+            "slug": f"{podcast_slug}-show-{index}",
+            "name": f"Émission {index}",
+            "description": "Lorem ipsum dolor sit amet " * 8,
+            "duration": 1800 + index,
+            "podcast_url_logo_large": f"{self.url}/static/{podcast_slug}/logo_large.png",
+        }
+
+    def _streams(self, stream_id: str) -> list:
+        """Build stream variants."""
+        return [
+            {
+                "transport": "http",
+                "url": f"https://streams.example.com/{stream_id}.mp3",
+                "codec": "mp3",
+                "bitrate": 128,
+            },
+            {"transport": "http", "url": f"https://streams.example.com/{stream_id}.aac", "codec": "aac", "bitrate": 64},
+            {
+                "transport": "hls",
+                "url": f"https://streams.example.com/{stream_id}.m3u8",
+                "codec": "aac",
+                "bitrate": 128,
+            },
+        ]
+
+    def _programs(self, radio_slug: str, day: str) -> list:
+        """Build a day of programs."""
+        start = int(time.mktime(time.strptime(day, "%Y-%m-%d")))
+        return [
+            {
+                "start": start + hour * 3600,
+                "end": start + (hour + 1) * 3600,
+                "title": f"{radio_slug} {hour}h",
+                "description": "Lorem ipsum dolor sit amet",
+            }
+            for hour in range(24)
+        ]
+
+
+@lru_cache(maxsize=None)
+def _png(width: int, height: int, color: int) -> bytes:
+    """Build a PNG image of a single color."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    pixel = bytes([(color * 37) % 256, (color * 91) % 256, (color * 151) % 256])
+    rows = b"".join(b"\x00" + pixel * width for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
@@ -0,0 +1,124 @@
+"""Run a single plugin invocation against the fake Orange API and print its metrics as JSON.
+
+Usage: python invoke.py <api url> <plugin path> [query]
+
+Setting BENCH_TRACEMALLOC=0 disables memory tracing, which otherwise slows imports down, for import time measurements
+made with python -X importtime: every import reported after the ADDON_START_MARKER line is paid by the invocation.
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+import tracemalloc
+from importlib.abc import MetaPathFinder
+from importlib.machinery import PathFinder
+from threading import Thread
+
+_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+_RESOURCES = os.path.join(os.path.dirname(_BENCHMARKS), "resources")
+_ORANGE_HOSTS = ["https://api.radio.orange.com", "https://radio.orange.com"]
+
+ADDON_START_MARKER = "benchmark: addon start"
+
+
+def use_addon_modules() -> None:
+    """Make the addon modules importable, with the stub Kodi modules."""
+    sys.path[:0] = [os.path.join(_BENCHMARKS, "kodi"), _RESOURCES]
+
+
+class EndpointPatcher(MetaPathFinder):
+    """Point the endpoints of the Orange provider module to the fake API as soon as it is imported."""
+
+    def __init__(self, api_url: str):
+        """Initialize Endpoint Patcher object."""
+        self.api_url = api_url
+
+    def find_spec(self, fullname: str, path=None, target=None):
+        """Wrap the loader of the Orange provider module."""
+        if fullname != "lib.providers.orange":
+            return None
+
+        spec = PathFinder.find_spec(fullname, path)
+        exec_module = spec.loader.exec_module
+
+        def patched_exec_module(module) -> None:
+            exec_module(module)
+            for name, value in list(vars(module).items()):
+                if name.endswith("_ENDPOINT") and isinstance(value, str):
+                    for host in _ORANGE_HOSTS:
+                        value = value.replace(host, self.api_url)
+                    setattr(module, name, value)
+
+        spec.loader.exec_module = patched_exec_module
+        return spec
+
+
+def listen() -> tuple:
+    """Listen on a local port like IPTV Manager does, counting the bytes received."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    received = {"bytes": 0}
+
+    def accept() -> None:
+        connection, _ = server.accept()
+        with connection:
+            while True:
+                data = connection.recv(65536)
+                if not data:
+                    break
+                received["bytes"] += len(data)
+
+    thread = Thread(target=accept, daemon=True)
+    thread.start()
+    return server.getsockname()[1], thread, received
+
+
+def main() -> None:
+    """Run the invocation."""
+    api_url, path = sys.argv[1], sys.argv[2]
+    query = sys.argv[3] if len(sys.argv) > 3 else ""
+    port, listener, received = listen()
+
+    use_addon_modules()
+    sys.meta_path.insert(0, EndpointPatcher(api_url))
+    sys.argv = [f"plugin://plugin.audio.orange.radio{path}", "1", query.format(port=port)]
+
+    trace_memory = os.environ.get("BENCH_TRACEMALLOC", "1") != "0"
+
+    if trace_memory:
+        tracemalloc.start()
+
+    print(ADDON_START_MARKER, file=sys.stderr, flush=True)
+    start = time.perf_counter()
+
+    entry_point = os.path.join(_RESOURCES, "addon.py")
+    with open(entry_point, encoding="utf-8") as file:
+        exec(compile(file.read(), entry_point, "exec"), {"__name__": "__main__", "__file__": entry_point})
+
+    wall_time = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory() if trace_memory else (0, 0)
+    listener.join(timeout=5)
+
+    import xbmcplugin
+
+    print(
+        json.dumps(
+            {
+                "wall_time": wall_time,
+                "peak_memory": peak_memory,
+                "directory_items": len(xbmcplugin.items),
+                "plugin_calls": xbmcplugin.calls,
+                "resolved": [succeeded for succeeded, _ in xbmcplugin.resolved],
+                "iptv_bytes": received["bytes"],
+                "requests_loaded": "requests" in sys.modules,
+                "addon_modules": sorted(name for name in sys.modules if name == "lib" or name.startswith("lib.")),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
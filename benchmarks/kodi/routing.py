@@ -0,0 +1,43 @@
+"""Stand-in for the script.module.routing module, dispatching sys.argv like Kodi does."""
+
+import re
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+
+class Plugin:
+    """Minimal plugin router."""
+
+    def __init__(self, base_url: str = None):
+        """Initialize Plugin object."""
+        self._rules = []
+        self.handle = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else -1
+        self.args = {}
+
+    def route(self, pattern: str):
+        """Register the decorated function for the pattern."""
+        regex = re.sub(
+            r"<(path:)?(\w+)>",
+            lambda match: f"(?P<{match.group(2)}>{'.+' if match.group(1) else '[^/]+'})",
+            pattern,
+        )
+
+        def decorator(func):
+            self._rules.append((re.compile(f"^{regex}$"), func))
+            return func
+
+        return decorator
+
+    def run(self, argv: list = None) -> None:
+        """Dispatch the plugin URL given in argv."""
+        argv = argv or sys.argv
+        self.handle = int(argv[1]) if len(argv) > 1 else -1
+        self.args = parse_qs(argv[2].lstrip("?")) if len(argv) > 2 else {}
+        path = urlsplit(argv[0]).path or "/"
+
+        for regex, func in self._rules:
+            match = regex.match(path)
+            if match:
+                return func(**match.groupdict())
+
+        raise LookupError(f"No route for {path}")
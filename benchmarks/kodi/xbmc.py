@@ -0,0 +1,45 @@
+"""Stand-in for the xbmc module."""
+
+import os
+import sys
+import time
+
+LOGDEBUG = 0
+LOGINFO = 1
+LOGWARNING = 2
+LOGERROR = 3
+LOGFATAL = 4
+
+_LOG_LEVEL = int(os.environ.get("BENCH_LOG_LEVEL", LOGWARNING))
+
+
+def log(msg: str, level: int = LOGDEBUG) -> None:
+    """Print log messages at or above the configured level."""
+    if level >= _LOG_LEVEL:
+        print(msg, file=sys.stderr)
+
+
+def executeJSONRPC(jsonrpccommand: str) -> str:
+    """Answer every JSON-RPC command with an empty result."""
+    return '{"id": 0, "jsonrpc": "2.0", "result": {}}'
+
+
+class Monitor:
+    """Monitor which is never asked to abort."""
+
+    def abortRequested(self) -> bool:
+        """Return False."""
+        return False
+
+    def waitForAbort(self, timeout: float = -1) -> bool:
+        """Sleep for the given time."""
+        time.sleep(max(0, timeout))
+        return False
+
+
+class Player:
+    """Player which never plays."""
+
+    def isPlaying(self) -> bool:
+        """Return False."""
+        return False
@@ -0,0 +1,88 @@
+"""Stand-in for the xbmcaddon module, reading settings defaults from resources/settings.xml."""
+
+import json
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Profile folder used when BENCH_PROFILE is not set, created on first use outside of the working tree
+_DEFAULT_PROFILE = None
+
+
+def _load_settings() -> dict:
+    """Load settings defaults, overridden by the BENCH_SETTINGS JSON environment variable."""
+    tree = ET.parse(os.path.join(_ROOT, "resources", "settings.xml"))
+    settings = {
+        setting.get("id"): setting.get("default", "")
+        for setting in tree.iter("setting")
+        if setting.get("id") is not None
+    }
+    settings.update({key: str(value) for key, value in json.loads(os.environ.get("BENCH_SETTINGS", "{}")).items()})
+    return settings
+
+
+_SETTINGS = _load_settings()
+
+
+class Settings:
+    """Typed access to the addon settings."""
+
+    def getBool(self, id: str) -> bool:
+        """Get boolean setting."""
+        return _SETTINGS.get(id, "false").lower() == "true"
+
+    def getInt(self, id: str) -> int:
+        """Get integer setting."""
+        try:
+            return int(float(_SETTINGS.get(id, "0")))
+        except ValueError:
+            return 0
+
+    def getString(self, id: str) -> str:
+        """Get string setting."""
+        return _SETTINGS.get(id, "")
+
+
+def _get_default_profile() -> str:
+    """Get the temporary profile folder shared by the addon instances of the process."""
+    global _DEFAULT_PROFILE
+
+    if _DEFAULT_PROFILE is None:
+        _DEFAULT_PROFILE = tempfile.mkdtemp(prefix="bench-profile-")
+
+    return _DEFAULT_PROFILE
+
+
+class Addon:
+    """Addon whose profile folder is given by the BENCH_PROFILE environment variable, a temporary folder otherwise."""
+
+    def __init__(self, id: str = None):
+        """Initialize Addon object."""
+        self._info = {
+            "id": "plugin.audio.orange.radio",
+            "name": "Orange Radio",
+            "path": _ROOT,
+            "profile": os.environ.get("BENCH_PROFILE") or _get_default_profile(),
+        }
+
+    def getAddonInfo(self, id: str) -> str:
+        """Get addon info."""
+        return self._info.get(id, "")
+
+    def getLocalizedString(self, id: int) -> str:
+        """Get localized string."""
+        return f"#{id}"
+
+    def getSettings(self) -> Settings:
+        """Get addon settings."""
+        return Settings()
+
+    def getSetting(self, id: str) -> str:
+        """Get setting as string."""
+        return _SETTINGS.get(id, "")
+
+    def setSetting(self, id: str, value: str) -> None:
+        """Set setting."""
+        _SETTINGS[id] = value
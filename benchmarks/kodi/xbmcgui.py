@@ -0,0 +1,67 @@
+"""Stand-in for the xbmcgui module."""
+
+
+class InfoTagVideo:
+    """Video info tag storing what is set."""
+
+    def __init__(self):
+        """Initialize InfoTagVideo object."""
+        self.info = {}
+
+    def __getattr__(self, name: str):
+        """Store the value of any setter."""
+        if not name.startswith("set"):
+            raise AttributeError(name)
+        return lambda value: self.info.__setitem__(name[3:].lower(), value)
+
+
+class ListItem:
+    """List item storing what is set."""
+
+    def __init__(self, label: str = "", label2: str = "", path: str = "", offscreen: bool = False):
+        """Initialize ListItem object."""
+        self.label = label
+        self.path = path
+        self.art = {}
+        self.properties = {}
+        self.mime_type = None
+        self.video_info_tag = InfoTagVideo()
+
+    def setArt(self, dictionary: dict) -> None:
+        """Set art."""
+        self.art.update(dictionary)
+
+    def setProperties(self, dictionary: dict) -> None:
+        """Set properties."""
+        self.properties.update(dictionary)
+
+    def setProperty(self, key: str, value: str) -> None:
+        """Set property."""
+        self.properties[key] = value
+
+    def setContentLookup(self, enable: bool) -> None:
+        """Set content lookup."""
+
+    def setMimeType(self, mimetype: str) -> None:
+        """Set MIME type."""
+        self.mime_type = mimetype
+
+    def setPath(self, path: str) -> None:
+        """Set path."""
+        self.path = path
+
+    def getVideoInfoTag(self) -> InfoTagVideo:
+        """Get video info tag."""
+        return self.video_info_tag
+
+
+class Dialog:
+    """Dialog answering without user interaction."""
+
+    def ok(self, heading: str, message: str) -> bool:
+        """Acknowledge the message."""
+        return True
+
+    def input(self, heading: str, defaultt: str = "", *args) -> str:
+        """Return the default text."""
+        return defaultt
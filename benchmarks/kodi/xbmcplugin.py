@@ -0,0 +1,45 @@
+"""Stand-in for the xbmcplugin module, recording the calls made by the addon."""
+
+SORT_METHOD_NONE = 0
+SORT_METHOD_LABEL = 1
+SORT_METHOD_LABEL_IGNORE_THE = 2
+SORT_METHOD_DATE = 3
+SORT_METHOD_DURATION = 8
+SORT_METHOD_UNSORTED = 40
+
+calls = {"addDirectoryItem": 0, "addDirectoryItems": 0, "endOfDirectory": 0, "setResolvedUrl": 0}
+items = []
+resolved = []
+
+
+def addDirectoryItem(handle: int, url: str, listitem, isFolder: bool = False, totalItems: int = 0) -> bool:
+    """Record directory item."""
+    calls["addDirectoryItem"] += 1
+    items.append(listitem)
+    return True
+
+
+def addDirectoryItems(handle: int, items_: list, totalItems: int = 0) -> bool:
+    """Record directory items."""
+    calls["addDirectoryItems"] += 1
+    items.extend(listitem for _, listitem, _ in items_)
+    return True
+
+
+def endOfDirectory(handle: int, succeeded: bool = True, updateListing: bool = False, cacheToDisc: bool = True) -> None:
+    """Record end of directory."""
+    calls["endOfDirectory"] += 1
+
+
+def setResolvedUrl(handle: int, succeeded: bool, listitem) -> None:
+    """Record resolved URL."""
+    calls["setResolvedUrl"] += 1
+    resolved.append((succeeded, listitem))
+
+
+def setContent(handle: int, content: str) -> None:
+    """Ignore content type."""
+
+
+def addSortMethod(handle: int, sortMethod: int, labelMask: str = "", label2Mask: str = "") -> None:
+    """Ignore sort method."""
@@ -0,0 +1,6 @@
+"""Stand-in for the xbmcvfs module."""
+
+
+def translatePath(path: str) -> str:
+    """Return the path unchanged."""
+    return path
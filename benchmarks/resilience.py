@@ -0,0 +1,111 @@
+"""Tail latency benchmark of the request resilience policies.
+
+The same sequence of requests is sent to the fake Orange API, with a ratio of slow responses and of failing requests
+injected, once per policy: single attempts, retries with backoff, then retries and hedging of slow requests. The
+latency percentiles of the requests and the ratio of requests failing despite the policy are written as JSON, with
+the retries, hedged requests and circuit breaker rejections counted by the instrumentation.
+
+Usage: python benchmarks/resilience.py [--requests N] [--latency SECONDS] [--slow-ratio R] [--slow-latency SECONDS]
+                                       [--error-ratio R] [--output FILE]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from fake_api import FakeOrangeAPI
+from invoke import use_addon_modules
+
+# Settings of each policy, the circuit breaker being disabled so that every request is sent
+POLICIES = [
+    ("single attempt", {"network.retries": 0, "network.hedge_requests": False, "network.breaker_threshold": 0}),
+    ("retries", {"network.retries": 2, "network.hedge_requests": False, "network.breaker_threshold": 0}),
+    (
+        "retries + hedging",
+        {
+            "network.retries": 2,
+            "network.hedge_requests": True,
+            "network.hedge_percentile": 90,
+            "network.breaker_threshold": 0,
+        },
+    ),
+]
+
+
+def measure(api: FakeOrangeAPI, count: int, settings: dict) -> dict:
+    """Send the requests with the given policy settings and measure their latency."""
+    from lib.utils import instrumentation
+    from lib.utils.kodi import set_addon_setting
+    from lib.utils.request import request_json
+    from lib.utils.state import get_process_state
+
+    for name, value in settings.items():
+        set_addon_setting(name, value)
+
+    get_process_state().invalidate()
+    latencies = []
+    failures = 0
+
+    with instrumentation.collect_statistics():
+        for index in range(count):
+            start = time.perf_counter()
+            result = request_json(f"{api.url}/api/radios/radio-{index % 50}/streams")
+            latencies.append(time.perf_counter() - start)
+            failures += result is None
+
+    return {
+        **{f"p{p}": instrumentation.get_percentile(latencies, p) for p in (50, 90, 95, 99)},
+        "max": max(latencies),
+        "failure_ratio": failures / count,
+        **instrumentation.get_resilience_statistics(),
+    }
+
+
+def main() -> None:
+    """Parse arguments, run the benchmark and report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--slow-ratio", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    parser.add_argument("--error-ratio", type=float, default=0.05)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    use_addon_modules()
+    results = {}
+
+    with tempfile.TemporaryDirectory() as profile:
+        os.environ["BENCH_PROFILE"] = profile
+
+        for name, settings in POLICIES:
+            api = FakeOrangeAPI(
+                latency=args.latency,
+                slow_ratio=args.slow_ratio,
+                slow_latency=args.slow_latency,
+                error_ratio=args.error_ratio,
+            ).start()
+
+            try:
+                results[name] = result = measure(api, args.requests, settings)
+            finally:
+                api.stop()
+
+            print(
+                f"{name:<18} p50 {result['p50'] * 1000:5.0f} ms | p95 {result['p95'] * 1000:5.0f} ms"
+                f" | p99 {result['p99'] * 1000:5.0f} ms | max {result['max'] * 1000:5.0f} ms"
+                f" | {result['failure_ratio']:.1%} failed | {result['retries']} retries"
+                f" | {result['hedged']} hedged / {result['hedge_wins']} won",
+                file=sys.stderr,
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Offline benchmark of the addon routes.
+
+Each route is run as a fresh plugin invocation, like Kodi does on every click, against a local stand-in of the Orange
+API and stub Kodi modules. Wall time, API request count and peak Python memory are measured, first with an empty
+profile (cold), then with the profile left by the cold run (warm), and written as JSON.
+
+The time spent importing modules by each invocation is measured in a separate pass with python -X importtime and
+checked against the import time budget of the route: the command fails when a budget is exceeded, so that startup
+regressions, like a module imported by routes not using it, are visible.
+
+Usage: python benchmarks/run.py [--radios N] [--podcasts N] [--shows N] [--latency SECONDS] [--setting ID=VALUE]
+                                [--output FILE]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from fake_api import FakeOrangeAPI
+from invoke import ADDON_START_MARKER
+
+_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+
+# Route, plugin path, query and import time budget (in milliseconds) of the cold and warm invocations, calibrated
+# at about twice the time measured on a desktop computer. Warm invocations served from the catalog store do not send
+# any request and must not import requests.
+ROUTES = [
+    ("index", "/", "", {"cold": 300, "warm": 100}),
+    ("catchup_directory", "/podcasts/radio-1", "", {"cold": 300, "warm": 100}),
+    ("catchup_directory", "/podcasts/radio-1/podcast-1", "", {"cold": 300, "warm": 100}),
+    ("stream_live", "/stream/live/radio-1", "", {"cold": 300, "warm": 100}),
+    ("iptv_channels", "/iptv/channels", "?port={port}", {"cold": 300, "warm": 100}),
+]
+
+MODES = ["cold", "warm"]
+
+
+def invoke(api: FakeOrangeAPI, profile: str, path: str, query: str, settings: dict) -> dict:
+    """Run a plugin invocation in a new process and collect its metrics."""
+    api.reset_stats()
+    process = _run_invoke(api, profile, path, query, settings)
+
+    return {
+        **json.loads(process.stdout.strip().splitlines()[-1]),
+        "requests": api.request_count,
+        "bytes_received": api.bytes_sent,
+    }
+
+
+def measure_import_time(api: FakeOrangeAPI, profile: str, path: str, query: str, settings: dict) -> float:
+    """Run a plugin invocation in a new process and sum the time (in seconds) spent importing modules."""
+    process = _run_invoke(api, profile, path, query, settings, ["-X", "importtime"], {"BENCH_TRACEMALLOC": "0"})
+    report = process.stderr.split(ADDON_START_MARKER, 1)[-1]
+
+    return sum(int(self_time) for self_time in re.findall(r"^import time:\s+(\d+) \|", report, re.MULTILINE)) / 1e6
+
+
+def run(radios: int, podcasts: int, shows: int, latency: float, settings: dict) -> dict:
+    """Run every route cold then warm, once to collect metrics and once to measure import time."""
+    api = FakeOrangeAPI(radios, podcasts, shows, latency).start()
+    results = []
+
+    try:
+        for route, path, query, budget in ROUTES:
+            with tempfile.TemporaryDirectory() as profile:
+                metrics = [invoke(api, profile, path, query, settings) for _ in MODES]
+
+            with tempfile.TemporaryDirectory() as profile:
+                import_times = [measure_import_time(api, profile, path, query, settings) for _ in MODES]
+
+            for mode, mode_metrics, import_time in zip(MODES, metrics, import_times):
+                results.append(
+                    {
+                        "route": route,
+                        "path": path,
+                        "mode": mode,
+                        **mode_metrics,
+                        "import_time": import_time,
+                        "import_budget": budget[mode] / 1000,
+                    }
+                )
+    finally:
+        api.stop()
+
+    return {
+        "config": {"radios": radios, "podcasts": podcasts, "shows": shows, "latency": latency, "settings": settings},
+        "results": results,
+    }
+
+
+def _run_invoke(
+    api: FakeOrangeAPI,
+    profile: str,
+    path: str,
+    query: str,
+    settings: dict,
+    python_options: list = None,
+    environment: dict = None,
+) -> subprocess.CompletedProcess:
+    """Run invoke.py in a new process."""
+    env = {**os.environ, "BENCH_PROFILE": profile, "BENCH_SETTINGS": json.dumps(settings), **(environment or {})}
+
+    return subprocess.run(
+        [sys.executable, *(python_options or []), os.path.join(_BENCHMARKS, "invoke.py"), api.url, path, query],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def main() -> None:
+    """Parse arguments, run the benchmark and write results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--radios", type=int, default=300)
+    parser.add_argument("--podcasts", type=int, default=3000)
+    parser.add_argument("--shows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="API latency in seconds")
+    parser.add_argument("--setting", action="append", default=[], help="Addon setting override, as id=value")
+    parser.add_argument("--output", help="JSON output file, defaults to stdout")
+    args = parser.parse_args()
+
+    settings = dict(setting.split("=", 1) for setting in args.setting)
+    results = run(args.radios, args.podcasts, args.shows, args.latency, settings)
+
+    over_budget = [result for result in results["results"] if result["import_time"] > result["import_budget"]]
+
+    for result in results["results"]:
+        print(
+            f"{result['route']:<18} {result['path']:<30} {result['mode']:<5}"
+            f" {result['wall_time'] * 1000:>8.1f} ms {result['requests']:>4} requests"
+            f" {result['peak_memory'] / 1024:>9.0f} KiB"
+            f" imports {result['import_time'] * 1000:>6.1f} / {result['import_budget'] * 1000:.0f} ms"
+            f"{' OVER BUDGET' if result in over_budget else ''}",
+            file=sys.stderr,
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if len(over_budget) > 0:
+        sys.exit(f"{len(over_budget)} invocations exceeded their import time budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,21 @@
 """Managers."""
 
-from .iptv_manager import IPTVManager
-from .podcast_manager import PodcastManager
-from .stream_manager import StreamManager
+from importlib import import_module
 
-__all__ = ["IPTVManager", "PodcastManager", "StreamManager"]
+# Managers are imported on first access, so that each route only loads the manager it uses
+_MODULES = {
+    "IPTVManager": ".iptv_manager",
+    "PodcastManager": ".podcast_manager",
+    "SearchManager": ".search_manager",
+    "StreamManager": ".stream_manager",
+}
+
+__all__ = ["IPTVManager", "PodcastManager", "SearchManager", "StreamManager"]
+
+
+def __getattr__(name: str):
+    """Import managers lazily."""
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return getattr(import_module(_MODULES[name], __name__), name)
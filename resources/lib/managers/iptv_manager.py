@@ -2,10 +2,15 @@
 
 import json
 import socket
-from typing import Any, Callable
+from typing import Any, Callable, Iterator, List, Tuple
 
 from lib.providers import OrangeProvider
-from lib.utils.cache import use_cache
+from lib.utils.cache import cached_method
+from lib.utils.payload import Payload, get_payload_store, hash_revision, iter_json
+
+# Time (in seconds) during which channels are sent as is, then sent while being refreshed in the background
+_CHANNELS_TTL = 3600
+_CHANNELS_STALE_TTL = 7 * 24 * 3600
 
 
 class IPTVManager:
@@ -16,27 +21,56 @@ class IPTVManager:
         self.port = port
         self.provider = OrangeProvider()
 
-    def via_socket(func: Callable[[Any], Any]):
-        """Send the output of the wrapped function to socket."""
+    def via_socket(func: Callable[[Any], Payload]):
+        """Send the payload returned by the wrapped function to socket.
+
+        IPTV Manager only waits a few seconds for the connection, so it is made before the payload is built.
+        """
 
         def send(self) -> None:
             """Decorate to send over a socket."""
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.connect(("127.0.0.1", self.port))
             try:
-                sock.sendall(json.dumps(func(self)).encode())
+                get_payload_store().send(sock, func(self))
             finally:
                 sock.close()
 
         return send
 
+    @cached_method(_CHANNELS_TTL, _CHANNELS_STALE_TTL, settings=["orange.country"])
+    def get_channels(self) -> List[dict]:
+        """Return the live channels in JSON-STREAMS format."""
+        return self.provider.get_streams()
+
     @via_socket
-    @use_cache("streams.json")
-    def send_channels(self) -> dict:
-        """Return JSON-STREAMS formatted python datastructure to IPTV Manager."""
-        return dict(version=1, streams=self.provider.get_streams())
+    def send_channels(self) -> Payload:
+        """Return JSON-STREAMS formatted payload to IPTV Manager, identified by the channels it lists."""
+        streams = self.get_channels()
+        revision = hash_revision(json.dumps(stream, sort_keys=True) for stream in streams)
+        return Payload("channels", revision, lambda: iter_json(dict(version=1, streams=streams)))
 
     @via_socket
-    def send_epg(self) -> dict:
-        """Return JSON-EPG formatted python data structure to IPTV Manager."""
-        return dict(version=1, epg=self.provider.get_epg())
+    def send_epg(self) -> Payload:
+        """Return JSON-EPG formatted payload to IPTV Manager, identified by the update time of the EPG days it lists."""
+        first_day, last_day = self.provider.update_epg()
+        updates = self.provider.get_epg_updates(first_day, last_day)
+        revision = hash_revision(
+            [
+                first_day,
+                last_day,
+                *(f"{slug}/{day}/{updated_at!r}" for (slug, day), updated_at in sorted(updates.items())),
+            ]
+        )
+        return Payload("epg", revision, lambda: _iter_epg_json(self.provider.iter_epg(first_day, last_day)))
+
+
+def _iter_epg_json(epg: Iterator[Tuple[str, List[dict]]]) -> Iterator[str]:
+    """Encode a JSON-EPG document in pieces, holding the programs of a single radio at a time."""
+    yield '{"version": 1, "epg": {'
+
+    for index, (slug, programs) in enumerate(epg):
+        yield f"{', ' if index > 0 else ''}{json.dumps(slug)}: "
+        yield from iter_json(programs)
+
+    yield "}}"
@@ -4,7 +4,16 @@ import xbmcplugin
 
 from lib.providers import OrangeProvider
 from lib.router import router
-from lib.utils.gui import create_list_item
+from lib.utils.gui import render_directory
+from lib.utils.kodi import build_addon_url, get_addon_setting, localize
+from lib.utils.records import Link
+
+# Content type and sort methods of the radio, podcast and show levels
+_LEVELS = [
+    ("files", [xbmcplugin.SORT_METHOD_UNSORTED, xbmcplugin.SORT_METHOD_LABEL]),
+    ("tvshows", [xbmcplugin.SORT_METHOD_UNSORTED, xbmcplugin.SORT_METHOD_LABEL]),
+    ("episodes", [xbmcplugin.SORT_METHOD_UNSORTED, xbmcplugin.SORT_METHOD_LABEL, xbmcplugin.SORT_METHOD_DURATION]),
+]
 
 
 class PodcastManager:
@@ -14,13 +23,35 @@ class PodcastManager:
         """Initialize Podcast Manager object."""
         self.provider = OrangeProvider()
 
-    def build_directory(self, levels: str = None) -> None:
-        """Build podcast directory."""
+    def build_directory(self, levels: str = None, page: int = None) -> None:
+        """Build podcast directory, one page at a time when pagination is enabled."""
         levels = levels.split("/") if levels else []
-        items = self.provider.get_catchup_items(levels)
-
-        for item in items:
-            is_folder = item.get("is_folder")
-            xbmcplugin.addDirectoryItem(router.handle, item["path"], create_list_item(item, is_folder), is_folder)
 
-        xbmcplugin.endOfDirectory(router.handle)
+        if get_addon_setting("navigation.paginate", bool):
+            page = page or 1
+            items, has_next_page = self.provider.get_catchup_page(
+                levels, page, max(1, get_addon_setting("navigation.page_size", int))
+            )
+
+            if has_next_page:
+                path = build_addon_url(f"/podcasts/{'/'.join(levels)}?page={page + 1}")
+                items.append(Link(localize(30502), path))
+        else:
+            items = self.provider.get_catchup_items(levels)
+
+        if len(levels) == 0:
+            items = [Link(localize(30500), build_addon_url("/search")), *items]
+
+        content, sort_methods = _LEVELS[min(len(levels), len(_LEVELS) - 1)]
+        render_directory(
+            router.handle,
+            items,
+            content,
+            sort_methods,
+            cache_to_disc=get_addon_setting("navigation.cache_directories", bool),
+        )
+
+        if len(levels) == 0:
+            self.provider.preresolve_recent_live_streams()
+        else:
+            self.provider.preresolve_items(items)
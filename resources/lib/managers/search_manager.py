@@ -0,0 +1,27 @@
+"""Search Manager."""
+
+import xbmcplugin
+
+from lib.providers import OrangeProvider
+from lib.router import router
+from lib.utils.gui import render_directory
+from lib.utils.kodi import input_dialog, localize
+
+
+class SearchManager:
+    """Search radios, podcasts and shows."""
+
+    def __init__(self):
+        """Initialize Search Manager object."""
+        self.provider = OrangeProvider()
+
+    def build_directory(self, query: str = None) -> None:
+        """Build search results directory, asking for the query when missing."""
+        if not query:
+            query = input_dialog(localize(30501))
+
+        if not query:
+            xbmcplugin.endOfDirectory(router.handle, succeeded=False)
+            return
+
+        render_directory(router.handle, self.provider.search(query), "files", cache_to_disc=False)
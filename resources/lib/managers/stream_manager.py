@@ -10,6 +10,7 @@ from lib.providers import OrangeProvider
 from lib.router import router
 from lib.utils.gui import create_play_item
 from lib.utils.kodi import localize, log, ok_dialog
+from lib.utils.records import StreamInfo
 
 
 class StreamManager:
@@ -22,12 +23,13 @@ class StreamManager:
     def load_live_stream(self, stream_id: str) -> None:
         """Load live stream."""
         self._load_stream(self.provider.get_live_stream_info, stream_id)
+        self.provider.preresolve_recent_live_streams()
 
     def load_podcast_stream(self, stream_id: str) -> None:
         """Load podcast stream."""
         self._load_stream(self.provider.get_podcast_stream_info, stream_id)
 
-    def _load_stream(self, stream_getter: Callable[[str], dict], stream_id: str) -> None:
+    def _load_stream(self, stream_getter: Callable[[str], StreamInfo], stream_id: str) -> None:
         """Load stream."""
         try:
             stream_info = stream_getter(stream_id)
@@ -1,5 +1,18 @@
 """Managers."""
 
-from .orange import OrangeProvider
+from importlib import import_module
+
+# Providers are imported on first access, so that routes not needing any provider do not load them
+_MODULES = {
+    "OrangeProvider": ".orange",
+}
 
 __all__ = ["OrangeProvider"]
+
+
+def __getattr__(name: str):
+    """Import providers lazily."""
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return getattr(import_module(_MODULES[name], __name__), name)
@@ -1,13 +1,33 @@
 """."""
 
 import json
-from typing import List, Union
-
-from requests.exceptions import RequestException
-
-from lib.exceptions import AuthenticationRequired, StreamDataDecodeError
-from lib.utils.kodi import build_addon_url, get_addon_setting, log, set_addon_setting
-from lib.utils.request import request, request_json
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from math import ceil
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+import xbmc
+
+from lib.exceptions import AuthenticationRequired, StreamDataDecodeError, StreamRequestException
+from lib.utils.cache import cached_method
+from lib.utils.catalog import get_catalog_store
+from lib.utils.instrumentation import instrument_class
+from lib.utils.json_stream import JSONArrayStream
+from lib.utils.kodi import get_addon_setting, log
+from lib.utils.lock import single_flight
+from lib.utils.records import Link, Podcast, PodcastGroup, Radio, Record, Show, StreamInfo, dump_records, load_records
+from lib.utils.request import request, request_json, request_json_items
+from lib.utils.search import get_search_index
+from lib.utils.state import get_process_state
+from lib.utils.stream import select_stream
+from lib.utils.token import TokenManager
+
+R = TypeVar("R", bound=Record)
+T = TypeVar("T")
 
 _TOKEN_ENDPOINT = "https://radio.orange.com/token.php"
 
@@ -18,44 +38,264 @@ _RADIO_STREAMS_ENDPOINT = "https://api.radio.orange.com/api/radios/{stream_id}/s
 _RADIO_PODCASTS_ENDPOINT = "https://api.radio.orange.com/api/radios/{radio_id}/podcasts"
 _PODCAST_SHOWS_ENDPOINT = "https://api.radio.orange.com/api/podcasts/{podcast_id}/shows"
 _SHOW_STREAMS_ENDPOINT = "https://api.radio.orange.com/api/shows/{stream_id}/streams"
+_RADIO_EPG_ENDPOINT = "https://api.radio.orange.com/api/radios/{radio_id}/programs?date={day}"
+
+_PAGINATION = "?size={size}&page={page}"
+
+# Fields of the records of paginated endpoints used by the addon, the other ones being dropped while decoding
+_RADIO_FIELDS = ["slug", "name", "url_logo_large"]
+_BROWSING_PODCAST_FIELDS = ["slug", "name", "url_logo_large", "radio_permalink", "radio_name", "radio_url_logo_large"]
+_RADIO_PODCAST_FIELDS = ["slug", "name", "url_logo_large"]
+_SHOW_FIELDS = ["slug", "name", "podcast_url_logo_large", "duration"]
+
+# Time to live (in seconds) of cached responses, for endpoints not sending any validator
+_CACHE_TTL_POLICY = [
+    (re.compile(r"/api/browsing/"), 6 * 3600),
+    (re.compile(r"/api/radios/[^/]+/podcasts"), 3600),
+    (re.compile(r"/api/podcasts/[^/]+/shows"), 900),
+]
+
+# Time (in seconds) during which catalog data is served from the local catalog store
+_CATALOG_TTL = {
+    "radios": 6 * 3600,
+    "podcasts": 6 * 3600,
+    "radio_podcasts": 3600,
+    "shows": 900,
+    "streams": 600,
+    "epg": 6 * 3600,
+    "epg_failures": 3600,
+}
+
+# Time (in seconds) during which outdated directory results are served while being refreshed in the background
+_STALE_TTL = 7 * 24 * 3600
+
+
+def _cached(dataset: str, **kwargs) -> Callable:
+    """Cache directory records per country for the catalog TTL of the dataset, the service always refreshing them."""
+    kwargs.setdefault("dump", dump_records)
+    kwargs.setdefault("load", load_records)
+
+    return cached_method(
+        _CATALOG_TTL[dataset],
+        _STALE_TTL,
+        settings=["orange.country"],
+        refresh_when=lambda provider, *args: provider.revalidate,
+        **kwargs,
+    )
 
 
+def _cached_page(dataset: str) -> Callable:
+    """Cache non-empty directory pages like _cached does."""
+    return _cached(dataset, cache_if=_has_items, dump=_dump_page, load=_load_page)
+
+
+def _has_items(page: Tuple[List[Record], bool]) -> bool:
+    """Tell whether a directory page has items."""
+    return len(page[0]) > 0
+
+
+def _dump_page(page: Tuple[List[Record], bool]) -> list:
+    """Serialize a directory page."""
+    return [dump_records(page[0]), page[1]]
+
+
+def _load_page(data: list) -> Tuple[List[Record], bool]:
+    """Deserialize a directory page serialized by _dump_page."""
+    return load_records(data[0]), data[1]
+
+
+@instrument_class
 class OrangeProvider:
     """Orange Provider."""
 
     chunk_size = 2000
 
-    def get_live_stream_info(self, stream_id: str) -> dict:
+    def __init__(self, revalidate: bool = False):
+        """Initialize Orange Provider object."""
+        self.revalidate = revalidate
+        self.catalog = get_catalog_store()
+
+    def get_live_stream_info(self, stream_id: str) -> StreamInfo:
         """Get live stream info."""
+        self.catalog.record_play(_RADIO_STREAMS_ENDPOINT, stream_id)
         return self._get_stream_info(_RADIO_STREAMS_ENDPOINT, stream_id)
 
-    def get_podcast_stream_info(self, stream_id: str) -> dict:
+    def get_podcast_stream_info(self, stream_id: str) -> StreamInfo:
         """Get podcast stream info."""
         return self._get_stream_info(_SHOW_STREAMS_ENDPOINT, stream_id)
 
+    def preresolve_recent_live_streams(self) -> None:
+        """Queue the resolution of the most recently played live radios, so zapping does not wait for the API.
+
+        The streams are resolved by the service, pre-resolution being skipped when it is disabled.
+        """
+        if get_addon_setting("network.preresolve_count", int) > 0 and get_addon_setting("service.enabled", bool):
+            self.catalog.request_tasks("preresolve_live", [""])
+
+    def preresolve_items(self, items: List[Record]) -> None:
+        """Queue the resolution of the first shows of the directory items, resolved by the service when enabled."""
+        count = get_addon_setting("network.preresolve_count", int)
+        stream_ids = [item.slug for item in items if isinstance(item, Show)]
+
+        if count > 0 and len(stream_ids) > 0 and get_addon_setting("service.enabled", bool):
+            self.catalog.request_tasks("preresolve_show", stream_ids[:count])
+
     def get_streams(self) -> list:
         """Get live streams."""
-        country = get_addon_setting("orange.country")
-        radios = self._request_chunks(_BROWSING_RADIO_ENDPOINT.format(country=country))
+        radios = self._get_radios()
 
         log(f"{len(radios)} radios found")
 
         return [
-            {
-                "id": radio["slug"],
-                "name": radio["name"],
-                "logo": radio["url_logo_large"],
-                "stream": build_addon_url(f"/stream/live/{radio['slug']}"),
-                "radio": True,
-            }
+            {"id": radio.slug, "name": radio.name, "logo": radio.logo, "stream": radio.path, "radio": True}
             for radio in radios
         ]
 
-    def get_epg(self) -> list:
-        """Get EPG data."""
-        return []
+    def refresh_token(self) -> None:
+        """Refresh the access token if it is about to expire."""
+        _TOKEN_MANAGER.get_token()
+
+    def update_epg(self) -> Tuple[str, str]:
+        """Store EPG data of live radios over the configured window, and return its first and last days.
+
+        Only the days not stored yet are fetched: past days are never fetched again once stored, while upcoming days
+        are refreshed when outdated. Days which failed to be fetched are only fetched again after a while. The first
+        day is fetched alone: when it fails, the EPG endpoint is considered unavailable and no other day is fetched.
+        """
+        today = date.today()
+        past_days = get_addon_setting("iptv.epg_past_days", int)
+        days = [
+            (today + timedelta(days=offset)).isoformat()
+            for offset in range(-past_days, get_addon_setting("iptv.epg_days", int) + 1)
+        ]
+        first_day = days[0]
+
+        self.catalog.delete_epg_before(first_day)
+        updates = self.catalog.get_epg_updates(first_day)
+        failures = self.catalog.get_epg_failures(first_day, _CATALOG_TTL["epg_failures"])
+        now = time.time()
+
+        missing = [
+            (radio.slug, day)
+            for radio in self._get_radios()
+            for day in days
+            if (radio.slug, day) not in failures
+            and (
+                (radio.slug, day) not in updates
+                or (day >= today.isoformat() and now - updates[(radio.slug, day)] > _CATALOG_TTL["epg"])
+            )
+        ]
+
+        if len(missing) == 0:
+            return first_day, days[-1]
+
+        log(f"Fetching {len(missing)} EPG days")
+
+        first_programs = self._fetch_epg_day(*missing[0])
+
+        if first_programs is None:
+            log("Cannot fetch EPG, skipping its update", xbmc.LOGWARNING)
+            self.catalog.set_epg_failures(missing)
+            return first_day, days[-1]
+
+        with ThreadPoolExecutor(max_workers=self._get_max_workers(len(missing))) as executor:
+            programs = [first_programs, *executor.map(lambda key: self._fetch_epg_day(*key), missing[1:])]
+
+        self.catalog.set_epg_days(
+            [
+                (slug, day, day_programs)
+                for (slug, day), day_programs in zip(missing, programs)
+                if day_programs is not None
+            ]
+        )
+        self.catalog.set_epg_failures([key for key, day_programs in zip(missing, programs) if day_programs is None])
+
+        return first_day, days[-1]
+
+    def get_epg_updates(self, first_day: str, last_day: str) -> Dict[Tuple[str, str], float]:
+        """Get the update time of every stored radio EPG day between two days, included."""
+        return {
+            key: updated_at for key, updated_at in self.catalog.get_epg_updates(first_day).items() if key[1] <= last_day
+        }
+
+    def iter_epg(self, first_day: str, last_day: str) -> Iterator[Tuple[str, List[dict]]]:
+        """Iterate over the stored programs of every radio between two days, included, a radio at a time."""
+        return self.catalog.iter_epg(first_day, last_day)
+
+    def get_catchup_page(self, levels: List[str], page: int, page_size: int) -> Tuple[List[Record], bool]:
+        """Return a page of directory items for the specified levels, and whether there is a next page.
+
+        Only podcast and show levels are paginated, the other levels are returned at once. Pages are kept in the
+        process state, so that navigating back and forth in a reused interpreter does not build them again.
+        """
+        state = get_process_state()
+        key = ("catchup", tuple(levels), page, page_size)
+        cached_page = state.get_page(key) if not self.revalidate else None
+
+        if cached_page is None:
+            cached_page = self._get_catchup_page(levels, page, page_size)
+            state.set_page(key, cached_page)
+
+        items, has_next_page = cached_page
+        return list(items), has_next_page
+
+    def _get_catchup_page(self, levels: List[str], page: int, page_size: int) -> Tuple[List[Record], bool]:
+        """Build a page of directory items for the specified levels."""
+        if len(levels) == 1:
+            return self._get_podcasts_page(levels[0], page, page_size)
+
+        if len(levels) == 2:
+            return self._get_shows_page(levels[1], page, page_size)
+
+        return self.get_catchup_items(levels), False
+
+    @_cached_page("radio_podcasts")
+    def _get_podcasts_page(self, radio_id: str, page: int, page_size: int) -> Tuple[List[Podcast], bool]:
+        """Build a page of podcast items for the specified radio."""
+        podcasts = self.catalog.get_podcasts(
+            self._get_browsing_podcasts_dataset(),
+            self._get_radio_group(radio_id),
+            offset=(page - 1) * page_size,
+            limit=page_size + 1,
+        )
+
+        if len(podcasts) > 0 or radio_id == "other":
+            return podcasts[:page_size], len(podcasts) > page_size
+
+        dataset = f"radio_podcasts:{radio_id}"
+        return self._get_page(
+            dataset,
+            _CATALOG_TTL["radio_podcasts"],
+            ("radio_podcasts", radio_id),
+            _RADIO_PODCASTS_ENDPOINT.format(radio_id=radio_id),
+            page,
+            page_size,
+            lambda offset, limit: self.catalog.get_podcasts(dataset, offset=offset, limit=limit),
+            lambda podcast: self._to_podcast(podcast, radio_id),
+        )
+
+    @_cached_page("shows")
+    def _get_shows_page(self, podcast_id: str, page: int, page_size: int) -> Tuple[List[Show], bool]:
+        """Build a page of show items for the specified podcast."""
+        return self._get_page(
+            f"shows:{podcast_id}",
+            _CATALOG_TTL["shows"],
+            ("shows", podcast_id),
+            _PODCAST_SHOWS_ENDPOINT.format(podcast_id=podcast_id),
+            page,
+            page_size,
+            lambda offset, limit: self.catalog.get_shows(podcast_id, offset=offset, limit=limit),
+            self._to_show,
+        )
+
+    def search(self, query: str) -> List[Link]:
+        """Return a list of directory items matching the query."""
+        return [
+            Link(document["label"], document["path"], document["thumb"], bool(document["is_folder"]))
+            for document in get_search_index().search(query)
+        ]
 
-    def get_catchup_items(self, levels: List[str]) -> list:
+    def get_catchup_items(self, levels: List[str]) -> List[Record]:
         """Return a list of directory items for the specified levels."""
         depth = len(levels)
         item_getters = [
@@ -66,119 +306,363 @@ class OrangeProvider:
 
         return item_getters[depth](*levels)
 
-    def _get_podcast_radios(self) -> list:
-        """Load available podcast radios."""
+    def _get_radios(self) -> List[Radio]:
+        """Load live radios from the catalog, refreshing it from Orange when outdated."""
         country = get_addon_setting("orange.country")
-        podcasts = self._request_chunks(_BROWSING_PODCAST_ENDPOINT.format(country=country))
-        radios = {"other": {"label": "Other", "thumb": None, "path": build_addon_url("/podcasts/other")}}
+        dataset = f"radios:{country}"
 
-        for podcast in podcasts:
-            if podcast["radio_permalink"]:
-                radios[podcast["radio_permalink"].split("/")[-1]] = {
-                    "label": podcast["radio_name"],
-                    "thumb": podcast["radio_url_logo_large"],
-                }
+        def fetch() -> List[Radio]:
+            radios = self._request_chunks(_BROWSING_RADIO_ENDPOINT.format(country=country), _RADIO_FIELDS)
+            return [Radio(radio["slug"], radio["name"], radio["url_logo_large"]) for radio in radios]
 
-        return [
-            {
-                "is_folder": True,
-                "label": radio["label"],
-                "art": {"thumb": radio["thumb"]},
-                "path": build_addon_url(f"/podcasts/{radio_id}"),
-            }
-            for radio_id, radio in list(radios.items())
-        ]
+        self._refresh_dataset(
+            dataset, _CATALOG_TTL["radios"], fetch, lambda radios: self.catalog.set_radios(dataset, radios)
+        )
+        return self.catalog.get_radios(dataset)
 
-    def _get_podcasts(self, radio_id: str) -> list:
-        """Load available podcasts for the specified radio."""
-        if radio_id == "other":
-            country = get_addon_setting("orange.country")
-            podcasts = self._request_chunks(_BROWSING_PODCAST_ENDPOINT.format(country=country))
+    def _get_browsing_podcasts_dataset(self) -> str:
+        """Refresh the podcast browse catalog from Orange when outdated and return its dataset name."""
+        country = get_addon_setting("orange.country")
+        dataset = f"podcasts:{country}"
+
+        def fetch() -> List[Podcast]:
+            podcasts = self._request_chunks(
+                _BROWSING_PODCAST_ENDPOINT.format(country=country), _BROWSING_PODCAST_FIELDS
+            )
+            return [
+                Podcast(
+                    podcast["slug"],
+                    podcast["name"],
+                    podcast["url_logo_large"],
+                    (podcast["radio_permalink"] or "").split("/")[-1],
+                    podcast["radio_name"],
+                    podcast["radio_url_logo_large"],
+                )
+                for podcast in podcasts
+            ]
+
+        def store(podcasts: List[Podcast]) -> None:
+            groups = {"": PodcastGroup("", None, None, 0)}
+
+            for podcast in podcasts:
+                group = groups.get(podcast.radio_slug)
+
+                if group is None:
+                    group = PodcastGroup(podcast.radio_slug, podcast.radio_name, podcast.radio_logo, 0)
+                    groups[podcast.radio_slug] = group
+
+                group.podcast_count += 1
+
+            self.catalog.set_podcasts(dataset, podcasts, list(groups.values()))
+
+        self._refresh_dataset(dataset, _CATALOG_TTL["podcasts"], fetch, store)
+        return dataset
+
+    def _get_radio_group(self, radio_id: str) -> str:
+        """Get the radio slug grouping the podcasts of the radio folder, podcasts without radio being in "other"."""
+        return "" if radio_id == "other" else radio_id
+
+    @_cached("podcasts")
+    def _get_podcast_radios(self) -> List[PodcastGroup]:
+        """Load available podcast radios from the radio grouping of the podcast browse catalog, "Other" first."""
+        groups = self.catalog.get_podcast_groups(self._get_browsing_podcasts_dataset())
+        other = next((group for group in groups if group.radio_slug == ""), PodcastGroup("", None, None, 0))
+        return [other, *(group for group in groups if group.radio_slug != "")]
+
+    @_cached("radio_podcasts")
+    def _get_podcasts(self, radio_id: str) -> List[Podcast]:
+        """Load available podcasts for the specified radio from the radio grouping of the podcast browse catalog."""
+        podcasts = self.catalog.get_podcasts(self._get_browsing_podcasts_dataset(), self._get_radio_group(radio_id))
+
+        if len(podcasts) > 0 or radio_id == "other":
+            return podcasts
+
+        self.refresh_radio_podcasts(radio_id)
+        return self.catalog.get_podcasts(f"radio_podcasts:{radio_id}")
+
+    def refresh_radio_podcasts(self, radio_id: str) -> None:
+        """Fetch, store and index the podcasts of a radio missing from the podcast browse catalog when outdated."""
+        dataset = f"radio_podcasts:{radio_id}"
+
+        def fetch() -> List[Podcast]:
+            podcasts = self._request_chunks(_RADIO_PODCASTS_ENDPOINT.format(radio_id=radio_id), _RADIO_PODCAST_FIELDS)
+            return [self._to_podcast(podcast, radio_id) for podcast in podcasts]
+
+        self._refresh_dataset(
+            dataset,
+            _CATALOG_TTL["radio_podcasts"],
+            fetch,
+            lambda podcasts: self.catalog.set_podcasts(dataset, podcasts),
+        )
+
+    @_cached("shows")
+    def _get_podcast_shows(self, radio_id: str, podcast_id: str) -> List[Show]:
+        """Load available shows for the specified podcast."""
+        self.refresh_shows(podcast_id)
+        return self.catalog.get_shows(podcast_id)
+
+    def refresh_shows(self, podcast_id: str) -> None:
+        """Fetch, store and index the shows of a podcast when outdated."""
+
+        def fetch() -> List[Show]:
+            shows = self._request_chunks(_PODCAST_SHOWS_ENDPOINT.format(podcast_id=podcast_id), _SHOW_FIELDS)
+            return [self._to_show(show) for show in shows]
+
+        self._refresh_dataset(
+            f"shows:{podcast_id}", _CATALOG_TTL["shows"], fetch, lambda shows: self.catalog.set_shows(podcast_id, shows)
+        )
+
+    def run_tasks(self, limit: int) -> int:
+        """Run the most recently queued background tasks, returning the number of tasks run."""
+        tasks = self.catalog.pop_tasks(limit)
+
+        for name, argument in tasks:
+            self.run_task(name, argument)
+
+        return len(tasks)
+
+    def run_task(self, name: str, argument: str) -> None:
+        """Run a background task."""
+        runners = {
+            "radio_podcasts": self.refresh_radio_podcasts,
+            "shows": self.refresh_shows,
+            "preresolve_live": lambda _: self._preresolve_recent_live_streams(),
+            "preresolve_show": lambda stream_id: self._preresolve_streams(_SHOW_STREAMS_ENDPOINT, [stream_id]),
+        }
+        runner = runners.get(name)
+
+        if runner is None:
+            log(f"Unknown background task {name}", xbmc.LOGWARNING)
+            return
+
+        runner(argument)
+
+    def _get_page(
+        self,
+        dataset: str,
+        ttl: int,
+        refresh_task: Tuple[str, str],
+        url: str,
+        page: int,
+        page_size: int,
+        select: Callable[[int, int], List[R]],
+        to_record: Callable[[dict], R],
+    ) -> Tuple[List[R], bool]:
+        """Load a page of records from the catalog when fresh.
+
+        Otherwise, only this page is requested from Orange while the refresh task of the whole dataset is queued for
+        the service, which stores and indexes it so that the next pages and searches are served locally. When the
+        service is disabled, the dataset is refreshed right away instead.
+        """
+        if not self.catalog.is_fresh(dataset, ttl):
+            if get_addon_setting("service.enabled", bool):
+                self.catalog.request_tasks(refresh_task[0], [refresh_task[1]])
+                chunk = self._request_json(url + _PAGINATION.format(size=page_size, page=page), default={"result": []})
+                count = chunk.get("paginate", {}).get("count", 0)
+
+                return [to_record(item) for item in chunk.get("result", [])], page * page_size < count
+
+            self.run_task(*refresh_task)
+
+        rows = select((page - 1) * page_size, page_size + 1)
+        return rows[:page_size], len(rows) > page_size
+
+    def _to_podcast(self, podcast: dict, radio_id: str) -> Podcast:
+        """Build podcast record from podcast data."""
+        return Podcast(podcast["slug"], podcast["name"], podcast["url_logo_large"], radio_id)
+
+    def _to_show(self, show: dict) -> Show:
+        """Build show record from show data."""
+        return Show(show["slug"], show["name"], show["podcast_url_logo_large"], show["duration"])
+
+    def _get_stream_info(self, stream_endpoint: str, stream_id: str) -> StreamInfo:
+        """Load stream info from the catalog, or from Orange when outdated."""
+        stream_url = stream_endpoint.format(stream_id=stream_id)
+        stream_info = self.catalog.get_stream(stream_url, _CATALOG_TTL["streams"])
+
+        if stream_info is not None:
+            return stream_info
+
+        streams = self._request_json(stream_url, default={"result": []})["result"]
+        log(streams)
 
-            return []
+        stream_info = select_stream(streams)
 
-        podcasts = self._request_chunks(_RADIO_PODCASTS_ENDPOINT.format(radio_id=radio_id))
+        if stream_info is None:
+            raise StreamDataDecodeError()
 
-        return [
-            {
-                "is_folder": True,
-                "label": podcast["name"],
-                "art": {"thumb": podcast["url_logo_large"]},
-                "path": build_addon_url(f"/podcasts/{radio_id}/{podcast['slug']}"),
-            }
-            for podcast in podcasts
-        ]
+        self.catalog.set_stream(stream_url, stream_info)
 
-    def _get_podcast_shows(self, podcast_id: str) -> list:
-        """Load available shows for the specified podcast."""
-        shows = self._request_chunks(_PODCAST_SHOWS_ENDPOINT.format(podcast_id=podcast_id))
+        return stream_info
+
+    def _fetch_epg_day(self, radio_id: str, day: str) -> Optional[List[dict]]:
+        """Load the programs of a radio for a day, in JSON-EPG format."""
+        content = self._request_json(_RADIO_EPG_ENDPOINT.format(radio_id=radio_id, day=day))
+
+        if content is None:
+            return None
 
         return [
             {
-                "is_folder": False,
-                "label": show["name"],
-                "path": build_addon_url(f"/stream/podcast/{show['slug']}"),
-                "art": {"thumb": show["podcast_url_logo_large"]},
-                "info": {
-                    "duration": show["duration"],
-                },
+                "start": datetime.fromtimestamp(program["start"], tz=timezone.utc).isoformat(),
+                "stop": datetime.fromtimestamp(program["end"], tz=timezone.utc).isoformat(),
+                "title": program.get("title"),
+                "description": program.get("description"),
+                "image": program.get("url_logo_large"),
             }
-            for show in shows
+            for program in content.get("result", [])
+            if program.get("start") is not None and program.get("end") is not None
         ]
 
-    def _get_stream_info(self, stream_endpoint: str, stream_id: str) -> dict:
-        """Load stream info from Orange."""
-        streams = self._request_json(stream_endpoint.format(stream_id=stream_id), default={"result": []})["result"]
+    def _preresolve_recent_live_streams(self) -> None:
+        """Resolve and store the stream info of the most recently played live radios."""
+        count = get_addon_setting("network.preresolve_count", int)
+        self._preresolve_streams(_RADIO_STREAMS_ENDPOINT, self.catalog.get_recent_plays(_RADIO_STREAMS_ENDPOINT, count))
 
-        streams = [stream for stream in streams if stream["transport"] == "http"]
-        log(streams)
+    def _preresolve_streams(self, stream_endpoint: str, stream_ids: List[str]) -> None:
+        """Resolve and store the stream info of the given streams which are not stored yet."""
+        stream_urls = {stream_endpoint.format(stream_id=stream_id): stream_id for stream_id in stream_ids}
 
-        if len(streams) == 0:
-            raise StreamDataDecodeError()
+        if len(stream_urls) == 0:
+            return
+
+        missing = self.catalog.get_missing_streams(list(stream_urls.keys()), _CATALOG_TTL["streams"])
 
-        for stream in streams:
-            if stream["transport"] == "http":
-                return {"path": stream["url"], "mime_type": "video/mpeg"}
+        if len(missing) == 0:
+            return
 
-        raise StreamDataDecodeError()
+        def resolve(stream_url: str) -> None:
+            try:
+                self._get_stream_info(stream_endpoint, stream_urls[stream_url])
+            except StreamRequestException as e:
+                log(f"Cannot pre-resolve {stream_url}: {e}", xbmc.LOGDEBUG)
 
-    def _request_chunks(self, url: str) -> list:
-        """."""
-        pagination = "?size={size}&page={page}"
-        page = 0
-        count = 0
-        result = []
+        log(f"Pre-resolving {len(missing)} streams", xbmc.LOGDEBUG)
 
-        while count > len(result) or page == 0:
-            page += 1
-            chunk = self._request_json(url + pagination.format(size=self.chunk_size, page=page), default={"result": []})
-            count = chunk.get("paginate", {}).get("count", 0)
-            result.extend(chunk.get("result", []))
+        with ThreadPoolExecutor(max_workers=self._get_max_workers(len(missing))) as executor:
+            list(executor.map(resolve, missing))
 
-        return result
+    def _refresh_dataset(
+        self,
+        dataset: str,
+        ttl: int,
+        fetch: Callable[[], List[R]],
+        store: Callable[[List[R]], None],
+    ) -> None:
+        """Fetch, store and index the dataset when outdated, keeping outdated data when nothing could be fetched.
 
-    def _request_json(self, url: str, default: Union[dict, list] = None) -> Union[dict, list]:
-        """."""
-        orange_session_data = get_addon_setting("orange.session_data", dict)
-        access_token = orange_session_data.get("access_token")
-        content = None
+        The dataset is refreshed by a single process at a time, the other ones using it once refreshed.
+        """
+        if not self.revalidate and self.catalog.is_fresh(dataset, ttl):
+            return
 
-        if access_token is not None:
-            content = request_json(url, headers={"Authorization": f"Bearer {access_token}"})
+        from requests.exceptions import RequestException
+
+        def refresh() -> bool:
+            try:
+                rows = fetch()
+            except (RequestException, ValueError) as e:
+                log(f"Cannot refresh {dataset}: {e}", xbmc.LOGWARNING)
+                return False
+
+            if len(rows) > 0:
+                store(rows)
+                get_search_index().index_dataset_async(dataset, rows)
+
+            return True
+
+        single_flight(f"dataset-{dataset}", refresh, lambda: True if self.catalog.is_fresh(dataset, ttl) else None)
+
+    def _request_chunks(self, url: str, fields: List[str]) -> Iterator[dict]:
+        """Stream every record of a paginated endpoint, reduced to the given fields.
+
+        Records are decoded while pages are read. The pages after the first one are fetched concurrently, a bounded
+        window of pages ahead of the one being yielded. Each page is read to its end before being handed over, so that
+        its pooled connection is released even while the consumer is still reading an earlier page.
+        """
+        first_page = self._request_items(url + _PAGINATION.format(size=self.chunk_size, page=1), fields)
+        record_count = 0
+
+        for record in first_page:
+            record_count += 1
+            yield record
+
+        count = first_page.members.get("paginate", {}).get("count", 0)
+        page_count = ceil(count / self.chunk_size)
+
+        if page_count <= 1 or record_count >= count:
+            return
+
+        def fetch(page: int) -> List[dict]:
+            return list(self._request_items(url + _PAGINATION.format(size=self.chunk_size, page=page), fields))
+
+        max_workers = self._get_max_workers(page_count - 1)
+        pages = iter(range(2, page_count + 1))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque(executor.submit(fetch, page) for page in islice(pages, max_workers))
 
-        if content is None:
             try:
-                access_token = self._get_acces_token()
-                set_addon_setting("orange.session_data", {"access_token": access_token})
-            except RequestException as e:
-                raise AuthenticationRequired("Cannot fetch access token") from e
+                while len(pending) > 0:
+                    records = pending.popleft().result()
+                    next_page = next(pages, None)
+
+                    if next_page is not None:
+                        pending.append(executor.submit(fetch, next_page))
+
+                    yield from records
+            finally:
+                for future in pending:
+                    future.cancel()
 
-            content = request_json(url, headers={"Authorization": f"Bearer {access_token}"})
+    def _get_max_workers(self, task_count: int) -> int:
+        """Get the number of concurrent requests allowed for the given number of tasks."""
+        return max(1, min(get_addon_setting("network.max_concurrent_requests", int), task_count))
 
+    def _request_json(self, url: str, default: Union[dict, list] = None) -> Union[dict, list]:
+        """Request Orange API with the shared access token, refreshing it once if rejected."""
+        cache_ttl = _get_cache_ttl(url)
+        content = self._send_authorized(
+            lambda headers: request_json(url, headers=headers, cache_ttl=cache_ttl, revalidate=self.revalidate)
+        )
         return content if content is not None else default
 
-    def _get_acces_token(self) -> str:
-        """Get access token."""
-        res = request("GET", _TOKEN_ENDPOINT)
-        content = json.loads(res.json())
-        return content.get("access_token")
+    def _request_items(self, url: str, fields: List[str]) -> JSONArrayStream:
+        """Request Orange API like _request_json does, decoding the result records while the response is read."""
+        cache_ttl = _get_cache_ttl(url)
+        return self._send_authorized(
+            lambda headers: request_json_items(
+                url, headers=headers, fields=fields, cache_ttl=cache_ttl, revalidate=self.revalidate
+            )
+        )
+
+    def _send_authorized(self, send: Callable[[dict], T]) -> T:
+        """Send a request with the shared access token, refreshing it once if rejected."""
+        from requests.exceptions import HTTPError
+
+        access_token = _TOKEN_MANAGER.get_token()
+
+        try:
+            return send({"Authorization": f"Bearer {access_token}"})
+        except HTTPError:
+            _TOKEN_MANAGER.invalidate(access_token)
+
+            try:
+                return send({"Authorization": f"Bearer {_TOKEN_MANAGER.get_token()}"})
+            except HTTPError as e:
+                raise AuthenticationRequired("Access token rejected") from e
+
+
+def _get_cache_ttl(url: str) -> Optional[int]:
+    """Get the HTTP cache TTL of an endpoint, None meaning that its responses are not cached."""
+    return next((ttl for pattern, ttl in _CACHE_TTL_POLICY if pattern.search(url)), None)
+
+
+def _fetch_access_token() -> dict:
+    """Fetch access token."""
+    res = request("GET", _TOKEN_ENDPOINT)
+    return json.loads(res.json())
+
+
+_TOKEN_MANAGER = TokenManager(_fetch_access_token, "orange")
+get_process_state().on_invalidate(_TOKEN_MANAGER.reload)
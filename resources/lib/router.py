@@ -1,14 +1,42 @@
 """Addon router initialization."""
 
+import sys
+from urllib.parse import urlsplit
+
 import xbmc
 from routing import Plugin as Router
 
-from lib.utils.kodi import log
+from lib.utils.instrumentation import run_instrumented
+from lib.utils.kodi import flush_addon_settings, invalidate_addon_settings, log
+from lib.utils.request import get_connection_stats
+from lib.utils.state import get_process_state
 
 router = Router()
 
 
 def init_router():
-    """Init addon router."""
+    """Init addon router.
+
+    With reuselanguageinvoker, the router outlives the invocation it was created for: its handle and arguments are
+    reset from the current invocation, while pooled HTTP sessions are left open for the next invocations. Settings are
+    read again once per invocation and the settings written during the invocation are flushed at its end.
+    """
     log("Initializing addon router", xbmc.LOGDEBUG)
-    router.run()
+    invalidate_addon_settings()
+    state = get_process_state()
+    state.begin_invocation()
+
+    router.handle = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else -1
+    router.args = {}
+
+    try:
+        run_instrumented(urlsplit(sys.argv[0]).path or "/", router.run)
+    finally:
+        flush_addon_settings()
+        state.end_invocation()
+        stats = get_connection_stats()
+        log(
+            f"HTTP connections: {stats['opened']} opened, {stats['reused']} reused"
+            f" (invocation {state.invocations} of this interpreter)",
+            xbmc.LOGDEBUG,
+        )
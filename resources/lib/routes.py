@@ -1,8 +1,11 @@
-"""Addon routes."""
+"""Addon routes.
+
+Managers are imported by the routes using them, as each Kodi navigation is a new plugin invocation paying for every
+import of the entry point.
+"""
 
 import xbmc
 
-from lib.managers import IPTVManager, PodcastManager, StreamManager
 from lib.router import router
 from lib.utils.kodi import log
 
@@ -10,6 +13,8 @@ from lib.utils.kodi import log
 @router.route("/")
 def index():
     """Display podcast service index."""
+    from lib.managers import PodcastManager
+
     log("Display podcast index", xbmc.LOGINFO)
     PodcastManager().build_directory()
 
@@ -17,13 +22,28 @@ def index():
 @router.route("/podcasts/<path:levels>")
 def catchup_directory(levels: str):
     """Display podcast service directory."""
-    log(f"Display catchup directory {levels}", xbmc.LOGINFO)
-    PodcastManager().build_directory(levels)
+    from lib.managers import PodcastManager
+
+    page = router.args.get("page", [None])[0]
+    log(f"Display catchup directory {levels} (page {page})", xbmc.LOGINFO)
+    PodcastManager().build_directory(levels, int(page) if page else None)
+
+
+@router.route("/search")
+def search():
+    """Display search results for the query argument, or ask for a query."""
+    from lib.managers import SearchManager
+
+    query = router.args.get("query", [None])[0]
+    log(f"Display search results for {query}", xbmc.LOGINFO)
+    SearchManager().build_directory(query)
 
 
 @router.route("/stream/live/<stream_id>")
 def stream_live(stream_id: str):
     """Load live stream for the required channel id."""
+    from lib.managers import StreamManager
+
     log(f"Loading live stream {stream_id}", xbmc.LOGINFO)
     StreamManager().load_live_stream(stream_id)
 
@@ -31,6 +51,8 @@ def stream_live(stream_id: str):
 @router.route("/stream/podcast/<stream_id>")
 def stream_catchup(stream_id: str):
     """Load podcast stream for the required show id."""
+    from lib.managers import StreamManager
+
     log(f"Loading podcast stream {stream_id}", xbmc.LOGINFO)
     StreamManager().load_podcast_stream(stream_id)
 
@@ -38,6 +60,8 @@ def stream_catchup(stream_id: str):
 @router.route("/iptv/channels")
 def iptv_channels():
     """Return JSON-STREAMS formatted data for all live channels."""
+    from lib.managers import IPTVManager
+
     log("Loading channels for IPTV Manager", xbmc.LOGINFO)
     port = int(router.args.get("port")[0])
     IPTVManager(port).send_channels()
@@ -46,6 +70,8 @@ def iptv_channels():
 @router.route("/iptv/epg")
 def iptv_epg():
     """Return JSON-EPG formatted data for all live channel EPG data."""
+    from lib.managers import IPTVManager
+
     log("Loading EPG for IPTV Manager", xbmc.LOGINFO)
     port = int(router.args.get("port")[0])
     IPTVManager(port).send_epg()
@@ -0,0 +1,139 @@
+"""Background prefetch service."""
+
+import time
+from threading import Thread
+from typing import Callable
+
+import xbmc
+
+from lib.providers import OrangeProvider
+from lib.utils.artwork import get_artwork_mirror
+from lib.utils.kodi import get_addon_setting, log
+from lib.utils.request import close_sessions
+from lib.utils.state import get_process_state
+
+# Time (in seconds) between two checks for artwork queued by plugin invocations, and number mirrored at most per check
+_ARTWORK_INTERVAL = 15
+_ARTWORK_LIMIT = 1000
+
+# Time (in seconds) between two checks for tasks queued by plugin invocations, and number run at most per check
+_TASK_INTERVAL = 2
+_TASK_LIMIT = 20
+
+
+class PrefetchScheduler:
+    """Run a prefetch task periodically, pausing while paused and backing off on errors."""
+
+    poll_interval = 30
+    retry_delay = 60
+    max_retry_delay = 3600
+
+    def __init__(
+        self,
+        task: Callable[[], None],
+        get_interval: Callable[[], float],
+        monitor: xbmc.Monitor,
+        is_paused: Callable[[], bool] = lambda: False,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize Prefetch Scheduler object."""
+        self.task = task
+        self.get_interval = get_interval
+        self.monitor = monitor
+        self.is_paused = is_paused
+        self.clock = clock
+        self.failures = 0
+        self.next_run = clock()
+
+    def run(self) -> None:
+        """Run the task on schedule until Kodi requests the service to stop."""
+        while not self.monitor.abortRequested():
+            if not self.is_paused() and self.clock() >= self.next_run:
+                self.run_once()
+
+            delay = min(self.poll_interval, max(1, self.next_run - self.clock()))
+
+            if self.monitor.waitForAbort(delay):
+                break
+
+    def run_once(self) -> None:
+        """Run the task and schedule the next run."""
+        try:
+            self.task()
+        except Exception as e:
+            self.failures += 1
+            delay = min(self.max_retry_delay, self.retry_delay * 2 ** (self.failures - 1))
+            log(f"Prefetch failed ({e}), retrying in {delay}s", xbmc.LOGWARNING)
+            self.next_run = self.clock() + delay
+            return
+
+        self.failures = 0
+        self.next_run = self.clock() + self.get_interval()
+
+
+class SettingsMonitor(xbmc.Monitor):
+    """Monitor rebuilding the state derived from settings when the user changes them."""
+
+    def onSettingsChanged(self) -> None:
+        """Invalidate the settings snapshot and the process state derived from settings."""
+        get_process_state().invalidate()
+
+
+def prefetch_catalogs() -> None:
+    """Refresh the access token and revalidate radio and podcast catalogs into the HTTP cache."""
+    log("Prefetching catalogs", xbmc.LOGDEBUG)
+    provider = OrangeProvider(revalidate=True)
+    provider.refresh_token()
+    provider.get_streams()
+    provider.get_catchup_items([])
+
+
+def run_tasks() -> None:
+    """Run the background tasks queued by plugin invocations."""
+    OrangeProvider().run_tasks(_TASK_LIMIT)
+
+
+def mirror_artwork() -> None:
+    """Mirror the artwork queued by plugin invocations."""
+    get_artwork_mirror().mirror_pending(_ARTWORK_LIMIT)
+
+
+def run_service() -> None:
+    """Run the prefetch service, running queued tasks and mirroring artwork in separate threads.
+
+    Those threads do not wait for prefetches, and queued tasks do not wait for artwork downloads.
+    """
+    player = xbmc.Player()
+    scheduler = PrefetchScheduler(
+        task=prefetch_catalogs,
+        get_interval=lambda: max(5, get_addon_setting("service.prefetch_interval", int)) * 60,
+        monitor=SettingsMonitor(),
+        is_paused=lambda: player.isPlaying() or not get_addon_setting("service.enabled", bool),
+    )
+    artwork_scheduler = PrefetchScheduler(
+        task=mirror_artwork,
+        get_interval=lambda: _ARTWORK_INTERVAL,
+        monitor=xbmc.Monitor(),
+        is_paused=lambda: (
+            player.isPlaying()
+            or not get_addon_setting("service.enabled", bool)
+            or not get_addon_setting("navigation.mirror_artwork", bool)
+        ),
+    )
+    task_scheduler = PrefetchScheduler(
+        task=run_tasks,
+        get_interval=lambda: _TASK_INTERVAL,
+        monitor=xbmc.Monitor(),
+        is_paused=lambda: not get_addon_setting("service.enabled", bool),
+    )
+    threads = [Thread(target=artwork_scheduler.run), Thread(target=task_scheduler.run)]
+
+    for thread in threads:
+        thread.start()
+
+    try:
+        scheduler.run()
+    finally:
+        for thread in threads:
+            thread.join()
+        close_sessions()
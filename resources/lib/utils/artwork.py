@@ -0,0 +1,299 @@
+"""Local artwork mirror."""
+
+import os
+import tempfile
+from hashlib import sha1
+from io import BytesIO
+from queue import Empty, Queue
+from threading import Thread
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import xbmc
+import xbmcvfs
+
+from lib.utils.catalog import get_catalog_store
+from lib.utils.kodi import get_addon_info, get_addon_setting, log
+from lib.utils.lock import get_lock
+from lib.utils.state import get_process_state
+
+# Largest width and height (in pixels) of mirrored artwork
+_THUMB_SIZE = 256
+
+# Size (in bytes) above which downloaded artwork is discarded
+_MAX_DOWNLOAD_SIZE = 4 * 1024 * 1024
+
+# Time (in seconds) after which artwork which could not be mirrored is downloaded again
+_RETRY_DELAY = 24 * 3600
+
+# Number of pending artwork read from the catalog store at a time
+_BATCH_SIZE = 50
+
+_MEGABYTE = 1024 * 1024
+
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+
+
+class ArtworkMirror:
+    """Mirror remote artwork in the addon profile, reduced to thumbnail size and stored once per content.
+
+    Directories are rendered with the local copy of the artwork already mirrored, the other artwork being queued in the
+    catalog store and downloaded by the service with bounded concurrency, so that plugin invocations never wait for
+    it. Files are named after the hash of their content, so that logos shared by many URLs are stored once.
+    """
+
+    def __init__(self, folder: str, max_size: int):
+        """Initialize Artwork Mirror object."""
+        self.folder = folder
+        self.max_size = max_size
+        self.catalog = get_catalog_store()
+
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+
+    def resolve(self, urls: Iterable[Optional[str]], queue: bool = True) -> Dict[str, str]:
+        """Get the local path of the mirrored artwork of the given URLs, queuing the other ones when asked to."""
+        urls = list({url for url in urls if url and url.startswith(("http://", "https://"))})
+        filenames = self.catalog.get_artwork(urls)
+        missing = [url for url in urls if url not in filenames]
+
+        if queue and len(missing) > 0:
+            self.catalog.request_artwork(missing)
+
+        return {url: self._filepath(filename) for url, filename in filenames.items()}
+
+    def mirror_pending(self, limit: int) -> int:
+        """Download, reduce and store the most recently queued artwork, a single process mirroring at a time.
+
+        Return the number of artwork mirrored.
+        """
+        lock = get_lock("artwork", stale_after=600)
+
+        if not lock.acquire(blocking=False):
+            return 0
+
+        try:
+            max_workers = max(1, get_addon_setting("network.max_concurrent_requests", int))
+            attempted = 0
+            mirrored = 0
+
+            # Artwork queued by other processes while mirroring is picked up by the next batch
+            while attempted < limit:
+                urls = self.catalog.get_pending_artwork(_RETRY_DELAY, min(_BATCH_SIZE, limit - attempted))
+
+                if len(urls) == 0:
+                    break
+
+                attempted += len(urls)
+                mirrored += self._mirror_batch(urls, max_workers)
+
+            if attempted > 0:
+                log(f"{mirrored} / {attempted} artwork mirrored", xbmc.LOGDEBUG)
+                self.evict()
+
+            return mirrored
+        finally:
+            lock.release()
+
+    def evict(self) -> None:
+        """Remove least recently mirrored files until the mirror fits its maximum size."""
+        entries = []
+
+        for directory, _, filenames in os.walk(self.folder):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(directory, filename))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, filename))
+
+        total_size = sum(size for _, size, _ in entries)
+        evicted = []
+
+        for _, size, filename in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            evicted.append(filename)
+            total_size -= size
+
+        if len(evicted) > 0:
+            self.catalog.delete_artwork(evicted)
+
+            for filename in evicted:
+                try:
+                    os.remove(self._filepath(filename))
+                except OSError:
+                    continue
+
+    def _mirror_batch(self, urls: List[str], max_workers: int) -> int:
+        """Mirror artwork with a bounded number of worker threads, returning the number of artwork mirrored.
+
+        Plain threads are used rather than an executor, which refuses new tasks once the interpreter is exiting, so
+        that Kodi stopping the service does not fail the batch being mirrored.
+        """
+        queue: Queue = Queue()
+        results = []
+
+        for url in urls:
+            queue.put(url)
+
+        def work() -> None:
+            while True:
+                try:
+                    url = queue.get_nowait()
+                except Empty:
+                    return
+                results.append(self._mirror(url))
+
+        workers = [Thread(target=work) for _ in range(min(max_workers, len(urls)))]
+
+        for worker in workers:
+            worker.start()
+
+        for worker in workers:
+            worker.join()
+
+        return sum(results)
+
+    def _mirror(self, url: str) -> bool:
+        """Mirror the artwork of a URL, returning whether it succeeded."""
+        from requests.exceptions import RequestException
+
+        try:
+            content = _download(url)
+        except (RequestException, ValueError) as e:
+            log(f"Cannot mirror {url}: {e}", xbmc.LOGDEBUG)
+            self.catalog.set_artwork(url, None)
+            return False
+
+        reduced = _reduce(content)
+
+        if reduced is None:
+            log(f"Cannot mirror {url}: unsupported image", xbmc.LOGDEBUG)
+            self.catalog.set_artwork(url, None)
+            return False
+
+        data, extension = reduced
+        filename = f"{sha1(data).hexdigest()}.{extension}"
+        filepath = self._filepath(filename)
+
+        try:
+            if os.path.exists(filepath):
+                os.utime(filepath)
+            else:
+                _write_atomically(filepath, data)
+        except OSError as e:
+            log(f"Cannot write artwork: {e}", xbmc.LOGWARNING)
+            return False
+
+        self.catalog.set_artwork(url, filename)
+        return True
+
+    def _filepath(self, filename: str) -> str:
+        """Get the path of a mirrored file, files being spread in folders named after their first hash characters."""
+        return os.path.join(self.folder, filename[:2], filename)
+
+
+def _download(url: str) -> bytes:
+    """Download artwork, failing when it is too large."""
+    from lib.utils.request import request
+
+    res = request("GET", url, timeout=(5, 15), stream=True)
+    content = bytearray()
+
+    try:
+        for chunk in res.iter_content(64 * 1024):
+            content += chunk
+
+            if len(content) > _MAX_DOWNLOAD_SIZE:
+                raise ValueError("artwork too large")
+    finally:
+        res.close()
+
+    return bytes(content)
+
+
+def _get_extension(data: bytes) -> Optional[str]:
+    """Guess the file extension of an image from its first bytes."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+
+    return next((extension for signature, extension in _SIGNATURES if data.startswith(signature)), None)
+
+
+def _reduce(content: bytes) -> Optional[Tuple[bytes, str]]:
+    """Reduce an image to thumbnail size with Pillow when available, returning its data and file extension.
+
+    Images are stored as is when Pillow is not installed, and None is returned for content which is not an image.
+    """
+    extension = _get_extension(content)
+
+    if extension is None:
+        return None
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return content, extension
+
+    try:
+        with Image.open(BytesIO(content)) as image:
+            if image.width <= _THUMB_SIZE and image.height <= _THUMB_SIZE:
+                return content, extension
+
+            image.thumbnail((_THUMB_SIZE, _THUMB_SIZE))
+            output = BytesIO()
+
+            if image.mode in ("RGBA", "LA", "P"):
+                image.save(output, "PNG", optimize=True)
+                return output.getvalue(), "png"
+
+            image.convert("RGB").save(output, "JPEG", quality=85, optimize=True)
+            return output.getvalue(), "jpg"
+    except (OSError, ValueError) as e:
+        log(f"Cannot reduce artwork: {e}", xbmc.LOGDEBUG)
+        return content, extension
+
+
+def _write_atomically(filepath: str, data: bytes) -> None:
+    """Write a file through a temporary file, so that readers never see it partially written."""
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    fd, temp_filepath = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temp_filepath, filepath)
+    except OSError:
+        os.remove(temp_filepath)
+        raise
+
+
+_ARTWORK_MIRROR: Optional[ArtworkMirror] = None
+
+
+def get_artwork_mirror() -> ArtworkMirror:
+    """Get the artwork mirror stored in the addon profile."""
+    global _ARTWORK_MIRROR
+
+    if _ARTWORK_MIRROR is None:
+        folder = os.path.join(xbmcvfs.translatePath(get_addon_info("profile")), "cache", "artwork")
+        max_size = max(1, get_addon_setting("network.artwork_cache_size", int)) * _MEGABYTE
+        _ARTWORK_MIRROR = ArtworkMirror(folder, max_size)
+
+    return _ARTWORK_MIRROR
+
+
+def _reset_artwork_mirror() -> None:
+    """Drop the artwork mirror instance, so that it is created again with the current settings."""
+    global _ARTWORK_MIRROR
+    _ARTWORK_MIRROR = None
+
+
+get_process_state().on_invalidate(_reset_artwork_mirror)
@@ -1,37 +1,235 @@
-"""Cache utils."""
+"""Result cache utils."""
 
 import json
 import os
-from typing import Any, Callable
+import tempfile
+import time
+import zlib
+from functools import wraps
+from hashlib import sha1
+from threading import Lock, Thread
+from typing import Any, Callable, List, Optional, TypeVar
 
 import xbmc
 import xbmcvfs
 
-from lib.utils.kodi import get_addon_info, log
+from lib.utils.kodi import get_addon_info, get_addon_setting, log
+from lib.utils.lock import get_lock
+from lib.utils.state import get_process_state
 
+F = TypeVar("F", bound=Callable)
 
-def use_cache(filepath: str) -> Callable[[Callable], Callable]:
-    """Use cached data when Exception is raised or update cache on success."""
-    cache_folder = os.path.join(xbmcvfs.translatePath(get_addon_info("profile")), "cache")
+_MEGABYTE = 1024 * 1024
 
-    if not os.path.exists(cache_folder):
-        os.makedirs(cache_folder)
 
-    def decorator(func: Callable[[Any], Any]):
-        def wrapper(*args: Any, **kwargs: Any) -> Any:
-            result = {}
+class ResultCacheEntry:
+    """Cached function result with its freshness and stale-serving deadlines."""
+
+    def __init__(self, key: str, value: Any, fresh_until: float, stale_until: float):
+        """Initialize Result Cache Entry object."""
+        self.key = key
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+    def is_fresh(self) -> bool:
+        """Return True when the result can be served as is."""
+        return time.time() < self.fresh_until
+
+    def is_servable(self) -> bool:
+        """Return True when the result can be served while it is refreshed."""
+        return time.time() < self.stale_until
+
+
+class ResultCache:
+    """On-disk cache of function results, stored compressed and evicting least recently used entries when over size."""
+
+    def __init__(self, folder: str, max_size: int):
+        """Initialize Result Cache object."""
+        self.folder = folder
+        self.max_size = max_size
+        self._lock = Lock()
+
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+
+    def get(self, key: str) -> Optional[ResultCacheEntry]:
+        """Load the entry stored for the given key."""
+        filepath = self._filepath(key)
+
+        try:
+            with open(filepath, "rb") as file:
+                data = json.loads(zlib.decompress(file.read()))
+            os.utime(filepath)
+        except (OSError, ValueError, zlib.error):
+            return None
+
+        if data.get("key") != key:
+            return None
+
+        return ResultCacheEntry(key, data["value"], data["fresh_until"], data["stale_until"])
+
+    def set(self, entry: ResultCacheEntry) -> None:
+        """Store the entry atomically, then evict old entries when the cache is over size."""
+        data = {
+            "key": entry.key,
+            "fresh_until": entry.fresh_until,
+            "stale_until": entry.stale_until,
+            "value": entry.value,
+        }
+
+        try:
+            payload = zlib.compress(json.dumps(data).encode("utf-8"))
+            fd, temp_filepath = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
 
             try:
-                result = func(*args, **kwargs)
-                with open(os.path.join(cache_folder, filepath), "wb") as file:
-                    file.write(json.dumps(result).encode("utf-8"))
-            except Exception:
-                log("Can't load data: using cache instead", xbmc.LOGWARNING)
-                with open(os.path.join(cache_folder, filepath), encoding="utf-8") as file:
-                    result = json.loads("".join(file.readlines()))
+                with os.fdopen(fd, "wb") as file:
+                    file.write(payload)
+                os.replace(temp_filepath, self._filepath(entry.key))
+            except OSError:
+                os.remove(temp_filepath)
+                raise
+        except (OSError, TypeError, ValueError) as e:
+            log(f"Cannot write result cache entry: {e}", xbmc.LOGWARNING)
+            return
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits its maximum size."""
+        with self._lock:
+            entries = []
+
+            for filename in os.listdir(self.folder):
+                if not filename.endswith(".json.z"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.folder, filename))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, filename))
+
+            total_size = sum(size for _, size, _ in entries)
+
+            for _, size, filename in sorted(entries):
+                if total_size <= self.max_size:
+                    break
+                try:
+                    os.remove(os.path.join(self.folder, filename))
+                except OSError:
+                    continue
+                total_size -= size
+
+    def _filepath(self, key: str) -> str:
+        """Get the path of the file storing the given key."""
+        return os.path.join(self.folder, f"{sha1(key.encode('utf-8')).hexdigest()}.json.z")
+
+
+_RESULT_CACHE: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get the result cache stored in the addon profile."""
+    global _RESULT_CACHE
+
+    if _RESULT_CACHE is None:
+        folder = os.path.join(xbmcvfs.translatePath(get_addon_info("profile")), "cache", "results")
+        max_size = max(1, get_addon_setting("network.result_cache_size", int)) * _MEGABYTE
+        _RESULT_CACHE = ResultCache(folder, max_size)
 
-            return result
+    return _RESULT_CACHE
+
+
+def _reset_result_cache() -> None:
+    """Drop the result cache instance, so that it is created again with the current settings."""
+    global _RESULT_CACHE
+    _RESULT_CACHE = None
+
+
+get_process_state().on_invalidate(_reset_result_cache)
+
+
+def cached_method(
+    ttl: int,
+    stale_ttl: int,
+    settings: List[str] = None,
+    refresh_when: Callable[..., bool] = None,
+    cache_if: Callable[[Any], bool] = bool,
+    dump: Callable[[Any], Any] = None,
+    load: Callable[[Any], Any] = None,
+) -> Callable[[F], F]:
+    """Cache the results of a method, keyed by the method, its arguments and the given settings.
+
+    Fresh results are served for ttl seconds. Stale results are then served for stale_ttl more seconds while a
+    background thread refreshes them, a single process refreshing a given key at a time. Older results are only served
+    when the method fails. Calls for which refresh_when returns True always run the method and store its result, and
+    results for which cache_if returns False, empty ones by default, are not stored.
+
+    Results must be JSON serializable, unless dump converts them to JSON serializable values, load converting those
+    back. A stored value which cannot be loaded is ignored.
+    """
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(instance, *args):
+            key = json.dumps(
+                [func.__qualname__, list(args), [get_addon_setting(setting) for setting in settings or []]],
+                separators=(",", ":"),
+            )
+            cache = get_result_cache()
+            entry = cache.get(key) if refresh_when is None or not refresh_when(instance, *args) else None
+
+            if entry is not None and load is not None:
+                try:
+                    entry.value = load(entry.value)
+                except (KeyError, TypeError, ValueError):
+                    entry = None
+
+            def refresh() -> Any:
+                value = func(instance, *args)
+
+                if cache_if(value):
+                    now = time.time()
+                    stored_value = dump(value) if dump is not None else value
+                    cache.set(ResultCacheEntry(key, stored_value, now + ttl, now + ttl + stale_ttl))
+
+                return value
+
+            if entry is not None and entry.is_fresh():
+                return entry.value
+
+            if entry is not None and entry.is_servable():
+                _refresh_in_background(key, refresh)
+                return entry.value
+
+            try:
+                return refresh()
+            except Exception as e:
+                if entry is None:
+                    raise
+
+                log(f"Cannot load {func.__qualname__} ({e}): using cached result instead", xbmc.LOGWARNING)
+                return entry.value
 
         return wrapper
 
     return decorator
+
+
+def _refresh_in_background(key: str, refresh: Callable[[], Any]) -> None:
+    """Refresh a stale result in a background thread, unless another process is already refreshing it."""
+    lock = get_lock(f"result-{sha1(key.encode('utf-8')).hexdigest()}")
+
+    if not lock.acquire(blocking=False):
+        return
+
+    def run() -> None:
+        try:
+            refresh()
+        except Exception as e:
+            log(f"Cannot refresh stale result: {e}", xbmc.LOGWARNING)
+        finally:
+            lock.release()
+
+    log("Serving stale result while refreshing it", xbmc.LOGDEBUG)
+    Thread(target=run).start()
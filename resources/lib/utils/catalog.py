@@ -0,0 +1,416 @@
+"""SQLite catalog store."""
+
+import json
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Type, TypeVar
+
+import xbmcvfs
+
+from lib.utils.kodi import get_addon_info
+from lib.utils.records import Podcast, PodcastGroup, Radio, Record, Show, StreamInfo
+
+R = TypeVar("R", bound=Record)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    name TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS radios (
+    dataset TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    slug TEXT NOT NULL,
+    name TEXT,
+    logo TEXT,
+    PRIMARY KEY (dataset, slug)
+);
+CREATE INDEX IF NOT EXISTS radios_dataset_position ON radios (dataset, position);
+CREATE TABLE IF NOT EXISTS podcasts (
+    dataset TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    slug TEXT NOT NULL,
+    name TEXT,
+    logo TEXT,
+    radio_slug TEXT NOT NULL,
+    radio_name TEXT,
+    radio_logo TEXT,
+    PRIMARY KEY (dataset, slug)
+);
+CREATE INDEX IF NOT EXISTS podcasts_dataset_position ON podcasts (dataset, position);
+CREATE INDEX IF NOT EXISTS podcasts_dataset_radio ON podcasts (dataset, radio_slug, position);
+CREATE TABLE IF NOT EXISTS podcast_groups (
+    dataset TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    radio_slug TEXT NOT NULL,
+    radio_name TEXT,
+    radio_logo TEXT,
+    podcast_count INTEGER NOT NULL,
+    PRIMARY KEY (dataset, radio_slug)
+);
+CREATE TABLE IF NOT EXISTS shows (
+    podcast_slug TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    slug TEXT NOT NULL,
+    name TEXT,
+    logo TEXT,
+    duration INTEGER,
+    PRIMARY KEY (podcast_slug, slug)
+);
+CREATE INDEX IF NOT EXISTS shows_podcast_position ON shows (podcast_slug, position);
+CREATE TABLE IF NOT EXISTS epg (
+    radio_slug TEXT NOT NULL,
+    day TEXT NOT NULL,
+    programs TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (radio_slug, day)
+);
+CREATE INDEX IF NOT EXISTS epg_day ON epg (day);
+CREATE TABLE IF NOT EXISTS epg_failures (
+    radio_slug TEXT NOT NULL,
+    day TEXT NOT NULL,
+    failed_at REAL NOT NULL,
+    PRIMARY KEY (radio_slug, day)
+);
+CREATE TABLE IF NOT EXISTS plays (
+    stream_endpoint TEXT NOT NULL,
+    stream_id TEXT NOT NULL,
+    played_at REAL NOT NULL,
+    PRIMARY KEY (stream_endpoint, stream_id)
+);
+CREATE INDEX IF NOT EXISTS plays_played_at ON plays (stream_endpoint, played_at);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    connect_time REAL NOT NULL,
+    probed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artwork (
+    url TEXT PRIMARY KEY,
+    filename TEXT,
+    requested_at REAL NOT NULL,
+    fetched_at REAL
+);
+CREATE INDEX IF NOT EXISTS artwork_filename ON artwork (filename);
+CREATE TABLE IF NOT EXISTS tasks (
+    name TEXT NOT NULL,
+    argument TEXT NOT NULL,
+    requested_at REAL NOT NULL,
+    PRIMARY KEY (name, argument)
+);
+CREATE TABLE IF NOT EXISTS streams (
+    stream_key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    mime_type TEXT,
+    updated_at REAL NOT NULL
+);
+"""
+
+_RADIO_COLUMNS = ["slug", "name", "logo"]
+_PODCAST_COLUMNS = ["slug", "name", "logo", "radio_slug", "radio_name", "radio_logo"]
+_PODCAST_GROUP_COLUMNS = ["radio_slug", "radio_name", "radio_logo", "podcast_count"]
+_SHOW_COLUMNS = ["slug", "name", "logo", "duration"]
+
+# Number of parameters bound to a query at most, old SQLite versions not accepting more than 999
+_MAX_PARAMETERS = 500
+
+
+class CatalogStore:
+    """Store radios, podcasts, shows and stream URLs in indexed SQLite tables.
+
+    Radios and podcasts are grouped into datasets, one per endpoint response (e.g. the podcast browse catalog of a
+    country), each dataset remembering when it was last updated.
+    """
+
+    def __init__(self, filepath: str):
+        """Initialize Catalog Store object."""
+        self._lock = Lock()
+        self._connection = sqlite3.connect(filepath, timeout=10, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+
+    def is_fresh(self, dataset: str, ttl: float) -> bool:
+        """Check the dataset has been updated less than ttl seconds ago."""
+        with self._lock:
+            row = self._connection.execute("SELECT updated_at FROM datasets WHERE name = ?", (dataset,)).fetchone()
+
+        return row is not None and time.time() - row["updated_at"] < ttl
+
+    def get_radios(self, dataset: str) -> List[Radio]:
+        """Get the radios of the dataset."""
+        return self._select("radios", Radio, _RADIO_COLUMNS, "dataset = ?", (dataset,))
+
+    def set_radios(self, dataset: str, radios: List[Radio]) -> None:
+        """Replace the radios of the dataset."""
+        with self._lock, self._connection:
+            self._replace("radios", _RADIO_COLUMNS, "dataset", dataset, radios)
+
+    def get_podcasts(self, dataset: str, radio_slug: str = None, offset: int = 0, limit: int = -1) -> List[Podcast]:
+        """Get the podcasts of the dataset, optionally only those of the given radio."""
+        if radio_slug is None:
+            return self._select("podcasts", Podcast, _PODCAST_COLUMNS, "dataset = ?", (dataset,), offset, limit)
+
+        return self._select(
+            "podcasts",
+            Podcast,
+            _PODCAST_COLUMNS,
+            "dataset = ? AND radio_slug = ?",
+            (dataset, radio_slug),
+            offset,
+            limit,
+        )
+
+    def get_podcast_groups(self, dataset: str) -> List[PodcastGroup]:
+        """Get the radios grouping the podcasts of the dataset, with their podcast count."""
+        return self._select("podcast_groups", PodcastGroup, _PODCAST_GROUP_COLUMNS, "dataset = ?", (dataset,))
+
+    def set_podcasts(self, dataset: str, podcasts: List[Podcast], groups: List[PodcastGroup] = None) -> None:
+        """Replace the podcasts of the dataset, and the radios grouping them when given."""
+        with self._lock, self._connection:
+            self._replace("podcasts", _PODCAST_COLUMNS, "dataset", dataset, podcasts)
+
+            if groups is not None:
+                self._replace("podcast_groups", _PODCAST_GROUP_COLUMNS, "dataset", dataset, groups)
+
+    def get_shows(self, podcast_slug: str, offset: int = 0, limit: int = -1) -> List[Show]:
+        """Get the shows of the podcast."""
+        return self._select("shows", Show, _SHOW_COLUMNS, "podcast_slug = ?", (podcast_slug,), offset, limit)
+
+    def set_shows(self, podcast_slug: str, shows: List[Show]) -> None:
+        """Replace the shows of the podcast."""
+        with self._lock, self._connection:
+            self._replace("shows", _SHOW_COLUMNS, "podcast_slug", podcast_slug, shows, f"shows:{podcast_slug}")
+
+    def get_epg_updates(self, first_day: str) -> Dict[Tuple[str, str], float]:
+        """Get the update time of every stored radio EPG day, from the given day."""
+        query = "SELECT radio_slug, day, updated_at FROM epg WHERE day >= ?"
+
+        with self._lock:
+            return {
+                (row["radio_slug"], row["day"]): row["updated_at"]
+                for row in self._connection.execute(query, (first_day,))
+            }
+
+    def iter_epg(self, first_day: str, last_day: str) -> Iterator[Tuple[str, List[dict]]]:
+        """Iterate over the programs of every radio between two days, included, loading a radio at a time."""
+        slugs_query = "SELECT DISTINCT radio_slug FROM epg WHERE day BETWEEN ? AND ? ORDER BY radio_slug"
+        programs_query = "SELECT programs FROM epg WHERE radio_slug = ? AND day BETWEEN ? AND ? ORDER BY day"
+
+        with self._lock:
+            slugs = [row["radio_slug"] for row in self._connection.execute(slugs_query, (first_day, last_day))]
+
+        for slug in slugs:
+            with self._lock:
+                rows = self._connection.execute(programs_query, (slug, first_day, last_day)).fetchall()
+
+            yield slug, [program for row in rows for program in json.loads(row["programs"])]
+
+    def set_epg_days(self, days: List[Tuple[str, str, List[dict]]]) -> None:
+        """Store the programs of (radio slug, day) pairs."""
+        query = "INSERT OR REPLACE INTO epg (radio_slug, day, programs, updated_at) VALUES (?, ?, ?, ?)"
+        updated_at = time.time()
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                query, ((radio_slug, day, json.dumps(programs), updated_at) for radio_slug, day, programs in days)
+            )
+
+    def get_epg_failures(self, first_day: str, ttl: float) -> Set[Tuple[str, str]]:
+        """Get the (radio slug, day) pairs, from the given day, which failed to be fetched less than ttl seconds ago."""
+        query = "SELECT radio_slug, day FROM epg_failures WHERE day >= ? AND failed_at > ?"
+
+        with self._lock:
+            return {
+                (row["radio_slug"], row["day"])
+                for row in self._connection.execute(query, (first_day, time.time() - ttl))
+            }
+
+    def set_epg_failures(self, days: List[Tuple[str, str]]) -> None:
+        """Remember the (radio slug, day) pairs which failed to be fetched."""
+        query = "INSERT OR REPLACE INTO epg_failures (radio_slug, day, failed_at) VALUES (?, ?, ?)"
+        failed_at = time.time()
+
+        with self._lock, self._connection:
+            self._connection.executemany(query, ((radio_slug, day, failed_at) for radio_slug, day in days))
+
+    def delete_epg_before(self, day: str) -> None:
+        """Delete the programs and failures of the days before the given day."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM epg WHERE day < ?", (day,))
+            self._connection.execute("DELETE FROM epg_failures WHERE day < ?", (day,))
+
+    def get_stream(self, stream_key: str, ttl: float) -> Optional[StreamInfo]:
+        """Get the stream info stored less than ttl seconds ago."""
+        query = "SELECT path, mime_type FROM streams WHERE stream_key = ? AND updated_at > ?"
+
+        with self._lock:
+            row = self._connection.execute(query, (stream_key, time.time() - ttl)).fetchone()
+
+        return StreamInfo(row["path"], row["mime_type"]) if row is not None else None
+
+    def set_stream(self, stream_key: str, stream_info: StreamInfo) -> None:
+        """Store the stream info."""
+        query = "INSERT OR REPLACE INTO streams (stream_key, path, mime_type, updated_at) VALUES (?, ?, ?, ?)"
+
+        with self._lock, self._connection:
+            self._connection.execute(query, (stream_key, stream_info.path, stream_info.mime_type, time.time()))
+
+    def get_missing_streams(self, stream_keys: List[str], ttl: float) -> List[str]:
+        """Get the stream keys without stream info stored less than ttl seconds ago."""
+        query = (
+            f"SELECT stream_key FROM streams WHERE stream_key IN ({', '.join('?' * len(stream_keys))})"
+            " AND updated_at > ?"
+        )
+
+        with self._lock:
+            stored = {row["stream_key"] for row in self._connection.execute(query, (*stream_keys, time.time() - ttl))}
+
+        return [stream_key for stream_key in stream_keys if stream_key not in stored]
+
+    def record_play(self, stream_endpoint: str, stream_id: str) -> None:
+        """Remember the stream has just been played."""
+        query = "INSERT OR REPLACE INTO plays (stream_endpoint, stream_id, played_at) VALUES (?, ?, ?)"
+
+        with self._lock, self._connection:
+            self._connection.execute(query, (stream_endpoint, stream_id, time.time()))
+
+    def get_recent_plays(self, stream_endpoint: str, limit: int) -> List[str]:
+        """Get the ids of the most recently played streams."""
+        query = "SELECT stream_id FROM plays WHERE stream_endpoint = ? ORDER BY played_at DESC LIMIT ?"
+
+        with self._lock:
+            return [row["stream_id"] for row in self._connection.execute(query, (stream_endpoint, limit))]
+
+    def get_host_connect_time(self, host: str, ttl: float) -> Optional[float]:
+        """Get the connect time of the host probed less than ttl seconds ago, infinite when it failed."""
+        query = "SELECT connect_time FROM hosts WHERE host = ? AND probed_at > ?"
+
+        with self._lock:
+            row = self._connection.execute(query, (host, time.time() - ttl)).fetchone()
+
+        return row["connect_time"] if row is not None else None
+
+    def set_host_connect_time(self, host: str, connect_time: float) -> None:
+        """Store the connect time of the host."""
+        query = "INSERT OR REPLACE INTO hosts (host, connect_time, probed_at) VALUES (?, ?, ?)"
+
+        with self._lock, self._connection:
+            self._connection.execute(query, (host, connect_time, time.time()))
+
+    def get_artwork(self, urls: List[str]) -> Dict[str, str]:
+        """Get the file names of the mirrored artwork of the given URLs."""
+        artwork = {}
+
+        with self._lock:
+            for start in range(0, len(urls), _MAX_PARAMETERS):
+                chunk = urls[start : start + _MAX_PARAMETERS]
+                query = (
+                    f"SELECT url, filename FROM artwork WHERE url IN ({', '.join('?' * len(chunk))})"
+                    " AND filename IS NOT NULL"
+                )
+                artwork.update((row["url"], row["filename"]) for row in self._connection.execute(query, chunk))
+
+        return artwork
+
+    def request_artwork(self, urls: List[str]) -> None:
+        """Queue the artwork of the given URLs for mirroring, unless already queued."""
+        query = "INSERT OR IGNORE INTO artwork (url, filename, requested_at, fetched_at) VALUES (?, NULL, ?, NULL)"
+        requested_at = time.time()
+
+        with self._lock, self._connection:
+            self._connection.executemany(query, ((url, requested_at) for url in urls))
+
+    def get_pending_artwork(self, retry_after: float, limit: int) -> List[str]:
+        """Get the most recently queued URLs not mirrored yet, URLs which failed being retried after a delay."""
+        query = (
+            "SELECT url FROM artwork WHERE filename IS NULL AND (fetched_at IS NULL OR fetched_at < ?)"
+            " ORDER BY requested_at DESC LIMIT ?"
+        )
+
+        with self._lock:
+            return [row["url"] for row in self._connection.execute(query, (time.time() - retry_after, limit))]
+
+    def set_artwork(self, url: str, filename: Optional[str]) -> None:
+        """Store the file name of the mirrored artwork of the URL, None meaning that it could not be mirrored."""
+        query = "UPDATE artwork SET filename = ?, fetched_at = ? WHERE url = ?"
+
+        with self._lock, self._connection:
+            self._connection.execute(query, (filename, time.time(), url))
+
+    def delete_artwork(self, filenames: List[str]) -> None:
+        """Forget the artwork mirrored in the given files, so that it is mirrored again when requested."""
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM artwork WHERE filename = ?", ((name,) for name in filenames))
+
+    def request_tasks(self, name: str, arguments: List[str]) -> None:
+        """Queue a background task for each of the given arguments, unless already queued."""
+        query = "INSERT OR IGNORE INTO tasks (name, argument, requested_at) VALUES (?, ?, ?)"
+        requested_at = time.time()
+
+        with self._lock, self._connection:
+            self._connection.executemany(query, ((name, argument, requested_at) for argument in arguments))
+
+    def pop_tasks(self, limit: int) -> List[Tuple[str, str]]:
+        """Remove the most recently queued background tasks from the queue and return their name and argument."""
+        query = "SELECT name, argument FROM tasks ORDER BY requested_at DESC LIMIT ?"
+
+        with self._lock, self._connection:
+            tasks = [(row["name"], row["argument"]) for row in self._connection.execute(query, (limit,))]
+            self._connection.executemany("DELETE FROM tasks WHERE name = ? AND argument = ?", tasks)
+
+        return tasks
+
+    def _select(
+        self,
+        table: str,
+        record_type: Type[R],
+        columns: List[str],
+        where: str,
+        params: tuple,
+        offset: int = 0,
+        limit: int = -1,
+    ) -> List[R]:
+        """Select records ordered by position, a negative limit selecting all the rows after offset."""
+        query = f"SELECT {', '.join(columns)} FROM {table} WHERE {where} ORDER BY position LIMIT ? OFFSET ?"
+
+        with self._lock:
+            return [record_type(*row) for row in self._connection.execute(query, (*params, limit, offset))]
+
+    def _replace(
+        self, table: str, columns: List[str], key_column: str, key: str, rows: List[Record], dataset: str = None
+    ) -> None:
+        """Replace all the rows sharing the same key and mark the dataset as updated, within the current transaction."""
+        query = (
+            f"INSERT OR REPLACE INTO {table} ({key_column}, position, {', '.join(columns)})"
+            f" VALUES (?, ?, {', '.join('?' * len(columns))})"
+        )
+
+        self._connection.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (key,))
+        self._connection.executemany(
+            query, ((key, position, *(getattr(row, column) for column in columns)) for position, row in enumerate(rows))
+        )
+        self._connection.execute(
+            "INSERT OR REPLACE INTO datasets (name, updated_at) VALUES (?, ?)", (dataset or key, time.time())
+        )
+
+
+_CATALOG_STORE: Optional[CatalogStore] = None
+
+
+def get_catalog_store() -> CatalogStore:
+    """Get the catalog store of the addon profile."""
+    global _CATALOG_STORE
+
+    if _CATALOG_STORE is None:
+        profile_folder = xbmcvfs.translatePath(get_addon_info("profile"))
+
+        if not os.path.exists(profile_folder):
+            os.makedirs(profile_folder, exist_ok=True)
+
+        _CATALOG_STORE = CatalogStore(os.path.join(profile_folder, "catalog.db"))
+
+    return _CATALOG_STORE
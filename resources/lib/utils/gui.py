@@ -1,55 +1,92 @@
 """Helpers for Kodi GUI."""
 
+from typing import Dict, List, Tuple
+
+import xbmcplugin
 from xbmcgui import ListItem
 
+from lib.utils.instrumentation import timed
+from lib.utils.kodi import get_addon_setting
+from lib.utils.records import Record, StreamInfo
 
-def create_list_item(item_data: dict, is_folder: bool = False) -> ListItem:
-    """Create a list item from data."""
-    list_item = ListItem(label=item_data.get("label"), path=item_data.get("path"))
 
-    if "art" in item_data:
-        item_art_data: dict = item_data.get("art", {})
-        list_item.setArt(
-            {
-                "poster": item_art_data.get("poster"),
-                "thumb": item_art_data.get("thumb"),
-            }
-        )
+@timed("create_list_item")
+def create_list_item(item: Record, path: str = None, thumb: str = None) -> ListItem:
+    """Create a list item from a record, its path and thumb being derived from the record unless given."""
+    list_item = ListItem(label=item.label, path=path if path is not None else item.path, offscreen=True)
+    thumb = thumb if thumb is not None else item.thumb
+
+    if thumb is not None:
+        list_item.setArt({"thumb": thumb})
 
-    if not is_folder:
+    if not item.is_folder:
         list_item.setProperties(
             {
                 "IsPlayable": "true",
             }
         )
 
-    if "info" in item_data:
-        item_info_data: dict = item_data.get("info", {})
-        video_info_tag = list_item.getVideoInfoTag()
+    if item.duration is not None:
+        list_item.getVideoInfoTag().setDuration(item.duration)
 
-        if "duration" in item_info_data:
-            video_info_tag.setDuration(item_info_data.get("duration"))
+    return list_item
 
-        if "genres" in item_info_data:
-            video_info_tag.setGenres(item_info_data.get("genres"))
 
-        if "plot" in item_info_data:
-            video_info_tag.setPlot(item_info_data.get("plot"))
+@timed("create_directory_items")
+def create_directory_items(items: List[Record], thumbs: Dict[str, str] = None) -> List[Tuple[str, ListItem, bool]]:
+    """Create the (path, list item, is folder) tuples of a directory from records, replacing the given thumbs."""
+    directory_items = []
+    thumbs = thumbs or {}
 
-        if "year" in item_info_data:
-            video_info_tag.setYear(item_info_data.get("year"))
+    for item in items:
+        path = item.path
+        directory_items.append((path, create_list_item(item, path, thumbs.get(item.thumb)), item.is_folder))
 
-    return list_item
+    return directory_items
+
+
+@timed("render_directory")
+def render_directory(
+    handle: int,
+    items: List[Record],
+    content: str = None,
+    sort_methods: List[int] = None,
+    cache_to_disc: bool = True,
+) -> None:
+    """Render a whole directory, adding every item with a single call to Kodi.
+
+    When artwork mirroring is enabled, thumbs already mirrored are rendered from their local copy, and the other ones
+    are queued for the service to mirror them, unless the service is disabled.
+    """
+    thumbs = {}
+
+    if get_addon_setting("navigation.mirror_artwork", bool):
+        from lib.utils.artwork import get_artwork_mirror
+
+        thumbs = get_artwork_mirror().resolve(
+            (item.thumb for item in items), queue=get_addon_setting("service.enabled", bool)
+        )
+
+    directory_items = create_directory_items(items, thumbs)
+
+    if content is not None:
+        xbmcplugin.setContent(handle, content)
+
+    for sort_method in sort_methods or []:
+        xbmcplugin.addSortMethod(handle, sort_method)
+
+    xbmcplugin.addDirectoryItems(handle, directory_items, len(directory_items))
+    xbmcplugin.endOfDirectory(handle, cacheToDisc=cache_to_disc)
 
 
-def create_play_item(stream_info: dict = None) -> ListItem:
-    """Create a play item from stream data."""
+def create_play_item(stream_info: StreamInfo = None) -> ListItem:
+    """Create a play item from stream info."""
     if stream_info is None:
-        stream_info = {}
+        stream_info = StreamInfo()
 
-    play_item = ListItem(path=stream_info.get("path"))
+    play_item = ListItem(path=stream_info.path)
     play_item.setContentLookup(False)
-    play_item.setMimeType(stream_info.get("mime_type"))
+    play_item.setMimeType(stream_info.mime_type)
     play_item.setProperty("inputstream", "inputstream.ffmpegdirect")
 
     return play_item
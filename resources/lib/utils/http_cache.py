@@ -0,0 +1,225 @@
+"""HTTP revalidation cache."""
+
+import json
+import os
+import tempfile
+import time
+from hashlib import sha1
+from threading import Lock
+from typing import BinaryIO, Iterable, Iterator, Mapping, Optional, Tuple
+
+import xbmc
+import xbmcvfs
+
+from lib.utils.kodi import get_addon_info, get_addon_setting, log
+from lib.utils.state import get_process_state
+
+_MEGABYTE = 1024 * 1024
+
+
+class HTTPCacheEntry:
+    """Cached HTTP response body along with its validators."""
+
+    def __init__(self, url: str, body: str, etag: str = None, last_modified: str = None, expires: float = 0):
+        """Initialize HTTP cache entry."""
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def is_fresh(self) -> bool:
+        """Return True when the entry can be served without contacting the server."""
+        return time.time() < self.expires
+
+    def has_validators(self) -> bool:
+        """Return True when the entry can be revalidated with a conditional request."""
+        return self.etag is not None or self.last_modified is not None
+
+    def conditional_headers(self) -> dict:
+        """Build the headers of a conditional request for this entry."""
+        headers = {}
+
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class HTTPCache:
+    """On-disk HTTP cache evicting least recently used entries when over size.
+
+    Each entry is stored in a file made of a JSON line with the URL and validators, followed by the raw body, so that
+    bodies can be written and read in chunks.
+    """
+
+    def __init__(self, folder: str, max_size: int):
+        """Initialize HTTP cache object."""
+        self.folder = folder
+        self.max_size = max_size
+        self._lock = Lock()
+
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+
+    def get(self, url: str) -> Optional[HTTPCacheEntry]:
+        """Load the entry stored for the given URL."""
+        try:
+            with open(self._filepath(url), "rb") as file:
+                entry = self._read_entry(url, file)
+                body = file.read().decode("utf-8") if entry is not None else None
+        except (OSError, ValueError):
+            return None
+
+        if entry is not None:
+            entry.body = body
+
+        return entry
+
+    def iter_body(self, url: str, chunk_size: int = 65536) -> Optional[Tuple[HTTPCacheEntry, Iterator[bytes]]]:
+        """Load the validators of the entry stored for the given URL, and an iterator reading its body in chunks."""
+        filepath = self._filepath(url)
+
+        try:
+            with open(filepath, "rb") as file:
+                entry = self._read_entry(url, file)
+                offset = file.tell()
+        except (OSError, ValueError):
+            return None
+
+        if entry is None:
+            return None
+
+        def read() -> Iterator[bytes]:
+            with open(filepath, "rb") as file:
+                file.seek(offset)
+                yield from iter(lambda: file.read(chunk_size), b"")
+
+        return entry, read()
+
+    def set(self, entry: HTTPCacheEntry) -> None:
+        """Store the entry, then evict old entries when the cache is over size."""
+        for _ in self.set_stream(entry, [entry.body.encode("utf-8")]):
+            pass
+
+    def set_stream(self, entry: HTTPCacheEntry, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Store the entry while its body chunks are being read, returning the chunks.
+
+        The entry only replaces the stored one once every chunk has been read, then old entries are evicted when the
+        cache is over size. A body which could not be read completely is discarded.
+        """
+        filepath = self._filepath(entry.url)
+
+        def write() -> Iterator[bytes]:
+            temp_filepath = None
+
+            try:
+                fd, temp_filepath = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+
+                with os.fdopen(fd, "wb") as file:
+                    file.write(self._entry_header(entry))
+
+                    for chunk in chunks:
+                        file.write(chunk)
+                        yield chunk
+
+                os.replace(temp_filepath, filepath)
+            except OSError as e:
+                log(f"Cannot write HTTP cache entry: {e}", xbmc.LOGWARNING)
+            finally:
+                if temp_filepath is not None and os.path.exists(temp_filepath):
+                    os.remove(temp_filepath)
+
+            self.evict()
+
+        return write()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits its maximum size."""
+        with self._lock:
+            entries = []
+
+            for filename in os.listdir(self.folder):
+                if filename.endswith(".tmp"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.folder, filename))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, filename))
+
+            total_size = sum(size for _, size, _ in entries)
+
+            for _, size, filename in sorted(entries):
+                if total_size <= self.max_size:
+                    break
+                try:
+                    os.remove(os.path.join(self.folder, filename))
+                except OSError:
+                    continue
+                total_size -= size
+
+    def _entry_header(self, entry: HTTPCacheEntry) -> bytes:
+        """Serialize the URL and validators of the entry as the first line of its file."""
+        data = {
+            "url": entry.url,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "expires": entry.expires,
+        }
+        return json.dumps(data).encode("utf-8") + b"\n"
+
+    def _read_entry(self, url: str, file: BinaryIO) -> Optional[HTTPCacheEntry]:
+        """Read the first line of an entry file, touching it to keep it in the cache."""
+        data = json.loads(file.readline())
+        os.utime(file.name)
+
+        if data.get("url") != url:
+            return None
+
+        return HTTPCacheEntry(url, None, data.get("etag"), data.get("last_modified"), data.get("expires", 0))
+
+    def _filepath(self, url: str) -> str:
+        """Get the path of the file storing the given URL."""
+        return os.path.join(self.folder, f"{sha1(url.encode('utf-8')).hexdigest()}.cache")
+
+
+_HTTP_CACHE: Optional[HTTPCache] = None
+
+
+def get_http_cache() -> HTTPCache:
+    """Get the HTTP cache stored in the addon profile."""
+    global _HTTP_CACHE
+
+    if _HTTP_CACHE is None:
+        folder = os.path.join(xbmcvfs.translatePath(get_addon_info("profile")), "cache", "http")
+        max_size = max(1, get_addon_setting("network.http_cache_size", int)) * _MEGABYTE
+        _HTTP_CACHE = HTTPCache(folder, max_size)
+
+    return _HTTP_CACHE
+
+
+def _reset_http_cache() -> None:
+    """Drop the HTTP cache instance, so that it is created again with the current settings."""
+    global _HTTP_CACHE
+    _HTTP_CACHE = None
+
+
+get_process_state().on_invalidate(_reset_http_cache)
+
+
+def get_max_age(headers: Mapping[str, str]) -> Optional[int]:
+    """Extract max-age from the Cache-Control header."""
+    for directive in headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+
+        if name.lower() in ["no-store", "no-cache"]:
+            return 0
+
+        if name.lower() == "max-age" and value.isdigit():
+            return int(value)
+
+    return None
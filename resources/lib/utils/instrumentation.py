@@ -0,0 +1,257 @@
+"""Hot path instrumentation."""
+
+import os
+import re
+import time
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, TypeVar
+
+import xbmc
+import xbmcvfs
+
+from lib.utils.kodi import get_addon_info, get_addon_setting, log
+
+if TYPE_CHECKING:
+    import cProfile
+
+F = TypeVar("F", bound=Callable)
+
+# Number of cProfile dumps kept in the profile folder
+_MAX_PROFILES = 20
+
+# Code flag of generator functions, inspect.CO_GENERATOR (inspect being slow to import)
+_CO_GENERATOR = 0x20
+
+_ENABLED = False
+_LOCK = Lock()
+_TIMINGS: Dict[str, List[float]] = {}
+_HTTP = {"requests": 0, "bytes": 0, "time": 0.0, "hit": 0, "miss": 0, "revalidated": 0, "stale": 0}
+_RESILIENCE = {"retries": 0, "hedged": 0, "hedge_wins": 0, "rejected": 0}
+_LATENCIES: List[float] = []
+
+
+def is_enabled() -> bool:
+    """Tell whether the current invocation is instrumented."""
+    return _ENABLED
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Time every call of the decorated function while instrumentation is enabled.
+
+    Timings are inclusive: the time of a call also counts the time of the instrumented calls it makes. Generator
+    functions are timed while producing their items, up to their end, excluding the time spent by the consumer.
+    """
+
+    def decorator(func: F) -> F:
+        if func.__code__.co_flags & _CO_GENERATOR:
+            return _timed_generator(name, func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_timing(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def _timed_generator(name: str, func: F) -> F:
+    """Time the iteration of the generators returned by the decorated generator function."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        generator = func(*args, **kwargs)
+
+        if not _ENABLED:
+            return (yield from generator)
+
+        duration = 0.0
+
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration as e:
+                    return e.value
+                finally:
+                    duration += time.perf_counter() - start
+
+                yield item
+        finally:
+            generator.close()
+            record_timing(name, duration)
+
+    return wrapper
+
+
+def instrument_class(cls: type) -> type:
+    """Time every method defined by the class."""
+    for name, member in list(vars(cls).items()):
+        if callable(member) and not name.startswith("__"):
+            setattr(cls, name, timed(f"{cls.__name__}.{name}")(member))
+
+    return cls
+
+
+def record_timing(name: str, duration: float) -> None:
+    """Add a call duration to the timings of the invocation."""
+    with _LOCK:
+        timing = _TIMINGS.setdefault(name, [0, 0.0])
+        timing[0] += 1
+        timing[1] += duration
+
+
+def record_http(method: str, url: str, status: int, size: int, duration: float) -> None:
+    """Add an HTTP request to the statistics of the invocation."""
+    if not _ENABLED:
+        return
+
+    with _LOCK:
+        _HTTP["requests"] += 1
+        _HTTP["bytes"] += size
+        _HTTP["time"] += duration
+
+    log(f"HTTP {method} {url} -> {status}, {size} bytes in {duration * 1000:.0f} ms", xbmc.LOGDEBUG)
+
+
+def record_cache(url: str, outcome: str) -> None:
+    """Count an HTTP cache lookup, its outcome being hit, miss, revalidated or stale."""
+    if not _ENABLED:
+        return
+
+    with _LOCK:
+        _HTTP[outcome] += 1
+
+    log(f"HTTP cache {outcome} for {url}", xbmc.LOGDEBUG)
+
+
+def record_latency(latency: float) -> None:
+    """Add the latency of a successful request attempt, counting its hedged request, to the statistics."""
+    if not _ENABLED:
+        return
+
+    with _LOCK:
+        _LATENCIES.append(latency)
+
+
+def record_resilience(event: str) -> None:
+    """Count an event of the resilience policy: retries, hedged, hedge_wins or rejected."""
+    if not _ENABLED:
+        return
+
+    with _LOCK:
+        _RESILIENCE[event] += 1
+
+
+def get_resilience_statistics() -> Dict[str, int]:
+    """Get the counts of the events of the resilience policy."""
+    with _LOCK:
+        return dict(_RESILIENCE)
+
+
+def get_percentile(values: List[float], percentile: int) -> float:
+    """Get a percentile of the given values (nearest rank), 0 when there is none."""
+    if len(values) == 0:
+        return 0.0
+
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+def run_instrumented(name: str, func: Callable[[], None]) -> None:
+    """Run an invocation, timing it and optionally profiling it when instrumentation is enabled in settings."""
+    if not get_addon_setting("diagnostics.instrumentation", bool):
+        func()
+        return
+
+    profiler = None
+
+    if get_addon_setting("diagnostics.profile", bool):
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+    start = time.perf_counter()
+
+    try:
+        with collect_statistics():
+            if profiler is None:
+                func()
+            else:
+                profiler.runcall(func)
+    finally:
+        duration = time.perf_counter() - start
+        log(_summarize(name, duration), xbmc.LOGINFO)
+
+        if profiler is not None:
+            _dump_profile(name, profiler)
+
+
+@contextmanager
+def collect_statistics() -> Iterator[None]:
+    """Enable instrumentation within the block, the statistics collected before being cleared."""
+    global _ENABLED
+
+    _reset()
+    _ENABLED = True
+
+    try:
+        yield
+    finally:
+        _ENABLED = False
+
+
+def _reset() -> None:
+    """Clear the statistics of the previous invocation."""
+    with _LOCK:
+        _TIMINGS.clear()
+        _HTTP.update({key: type(value)() for key, value in _HTTP.items()})
+        _RESILIENCE.update({key: 0 for key in _RESILIENCE})
+        _LATENCIES.clear()
+
+
+def _summarize(name: str, duration: float) -> str:
+    """Build the one-line summary of the invocation."""
+    with _LOCK:
+        http = dict(_HTTP)
+        resilience = dict(_RESILIENCE)
+        latencies = list(_LATENCIES)
+        slowest = sorted(_TIMINGS.items(), key=lambda timing: timing[1][1], reverse=True)[:5]
+
+    percentiles = ", ".join(f"p{p} {get_percentile(latencies, p) * 1000:.0f} ms" for p in (50, 95, 99))
+    calls = ", ".join(f"{call} {total * 1000:.0f} ms ({count}x)" for call, (count, total) in slowest)
+
+    return (
+        f"Invocation {name} took {duration * 1000:.0f} ms"
+        f" | HTTP {http['requests']} requests, {http['bytes'] // 1024} KiB in {http['time'] * 1000:.0f} ms"
+        f" (cache {http['hit']} hits, {http['miss']} misses, {http['revalidated']} revalidated, {http['stale']} stale)"
+        f" | latency {percentiles} ({resilience['retries']} retries,"
+        f" {resilience['hedged']} hedged / {resilience['hedge_wins']} won, {resilience['rejected']} rejected)"
+        f" | {calls or 'no instrumented calls'}"
+    )
+
+
+def _dump_profile(name: str, profiler: "cProfile.Profile") -> None:
+    """Write the profiler stats to the profile folder, keeping the most recent dumps only."""
+    folder = os.path.join(xbmcvfs.translatePath(get_addon_info("profile")), "profiles")
+    os.makedirs(folder, exist_ok=True)
+
+    slug = re.sub(r"[^\w-]+", "_", name).strip("_") or "index"
+    filepath = os.path.join(folder, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}.prof")
+    profiler.dump_stats(filepath)
+    log(f"Profile written to {filepath}", xbmc.LOGINFO)
+
+    dumps = sorted(os.path.join(folder, filename) for filename in os.listdir(folder) if filename.endswith(".prof"))
+
+    for dump in dumps[:-_MAX_PROFILES]:
+        os.remove(dump)
@@ -0,0 +1,141 @@
+"""Incremental JSON decoding."""
+
+import codecs
+import json
+from typing import Iterable, Iterator, List, Optional
+
+_WHITESPACE = " \t\n\r"
+
+# Size of the consumed part of the buffer above which it is dropped, so that it is not copied after every item
+_COMPACT_THRESHOLD = 64 * 1024
+
+
+class JSONArrayStream:
+    """Decode the items of an array member of a JSON object while the document is being read.
+
+    Only the current item and the unread part of the current chunk are kept in memory, items being reduced to the
+    requested fields as soon as they are decoded. The other members of the object are decoded as a whole and available
+    in members once the iteration is over.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], key: str = "result", fields: Optional[List[str]] = None):
+        """Initialize JSON Array Stream object."""
+        self.key = key
+        self.fields = fields
+        self.members = {}
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def __iter__(self) -> Iterator[dict]:
+        """Iterate over the items of the array, reduced to the requested fields."""
+        self._expect("{")
+
+        if self._peek() == "}":
+            self._expect("}")
+        else:
+            while True:
+                name = self._decode_value()
+                self._expect(":")
+
+                if name == self.key and self._peek() == "[":
+                    yield from self._iter_items()
+                else:
+                    self.members[name] = self._decode_value()
+
+                if self._expect(",}") == "}":
+                    break
+
+        self._expect_end()
+
+    def _iter_items(self) -> Iterator[dict]:
+        """Iterate over the items of the array starting at the current position."""
+        self._expect("[")
+
+        if self._peek() == "]":
+            self._expect("]")
+            return
+
+        while True:
+            item = self._decode_value()
+
+            if self.fields is not None and isinstance(item, dict):
+                item = {field: item[field] for field in self.fields if field in item}
+
+            yield item
+
+            if self._expect(",]") == "]":
+                return
+
+    def _decode_value(self):
+        """Decode the value starting at the current position, reading more of the document until it is complete.
+
+        A value ending with the buffer, like a number, may continue in the next chunk, so it is only accepted once
+        followed by another character or at the end of the document.
+        """
+        self._peek()
+
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+
+            if end < len(self._buffer) or not self._read():
+                self._position = end
+                self._compact()
+                return value
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character, or an empty string at the end of the document."""
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+                self._position += 1
+
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+
+            if not self._read():
+                return ""
+
+    def _expect(self, characters: str) -> str:
+        """Consume the next character, failing unless it is one of the given characters."""
+        character = self._peek()
+
+        if character == "" or character not in characters:
+            raise json.JSONDecodeError(f"Expecting one of {characters!r}", self._buffer, self._position)
+
+        self._position += 1
+        return character
+
+    def _expect_end(self) -> None:
+        """Read the document until its end, so that the chunks are exhausted, failing unless only whitespace is left."""
+        if self._peek() != "":
+            raise json.JSONDecodeError("Extra data", self._buffer, self._position)
+
+    def _read(self) -> bool:
+        """Append the next chunk of the document to the buffer, returning False at the end of the document."""
+        if self._eof:
+            return False
+
+        for chunk in self._chunks:
+            text = self._text_decoder.decode(chunk)
+
+            if text:
+                self._buffer += text
+                return True
+
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _compact(self) -> None:
+        """Drop the consumed part of the buffer once it is large enough."""
+        if self._position > _COMPACT_THRESHOLD:
+            self._buffer = self._buffer[self._position :]
+            self._position = 0
@@ -3,11 +3,11 @@
 import json
 from enum import Enum
 from string import Formatter
-from typing import Type, TypeVar
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
 
 import xbmc
 import xbmcaddon
-import xbmcgui
 
 ADDON = xbmcaddon.Addon()
 ADDON_ID = ADDON.getAddonInfo("id")
@@ -15,6 +15,57 @@ ADDON_ID = ADDON.getAddonInfo("id")
 T = TypeVar("T", str, int, bool, dict)
 
 
+class SettingsStore:
+    """Typed snapshot of addon settings, with buffered writes.
+
+    Each setting is read from Kodi and parsed once, then served from memory until the store is invalidated, which the
+    router does at the start of each invocation. Writes are kept in memory and sent to Kodi, which saves the settings
+    file on every write, by a single flush at the end of the invocation.
+    """
+
+    def __init__(self):
+        """Initialize Settings Store object."""
+        self._lock = Lock()
+        self._values: Dict[Tuple[str, type], Any] = {}
+        self._pending: Dict[str, Tuple[str, Any]] = {}
+
+    def get(self, name: str, t: Type[T] = str) -> T:
+        """Get a setting, reading it from Kodi on first access."""
+        with self._lock:
+            if (name, t) not in self._values:
+                pending = self._pending.get(name)
+                self._values[(name, t)] = _read_setting(name, t) if pending is None else _parse_setting(pending[0], t)
+
+            value = self._values[(name, t)]
+
+        return dict(value) if t is dict else value
+
+    def set(self, name: str, value: T) -> None:
+        """Set a setting, to be written to Kodi on next flush."""
+        with self._lock:
+            self._values = {key: cached for key, cached in self._values.items() if key[0] != name}
+            self._values[(name, type(value))] = dict(value) if isinstance(value, dict) else value
+            self._pending[name] = (_to_setting_string(value), value)
+
+    def flush(self) -> None:
+        """Write pending settings to Kodi."""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+
+        for name, (value, _) in pending.items():
+            ADDON.setSetting(name, value)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Forget the values read from Kodi, for the given setting or all settings, keeping pending writes."""
+        with self._lock:
+            self._values = {key: value for key, value in self._values.items() if name is not None and key[0] != name}
+
+            for pending_name, (_, value) in self._pending.items():
+                if name is None or pending_name == name:
+                    self._values[(pending_name, type(value))] = value
+
+
 class DRM(Enum):
     """List DRM providers."""
 
@@ -41,19 +92,12 @@ def get_addon_info(name: str) -> str:
 
 def get_addon_setting(name: str, t: Type[T] = str) -> T:
     """Get addon setting from name."""
-    if t is bool:
-        return ADDON.getSettings().getBool(name)
+    return _SETTINGS.get(name, t)
 
-    if t is int:
-        return ADDON.getSettings().getInt(name)
 
-    if t is dict:
-        try:
-            return json.loads(ADDON.getSettings().getString(name))
-        except json.decoder.JSONDecodeError:
-            return {}
-
-    return ADDON.getSettings().getString(name)
+def flush_addon_settings() -> None:
+    """Write buffered addon settings to Kodi."""
+    _SETTINGS.flush()
 
 
 def get_drm() -> str:
@@ -81,6 +125,18 @@ def get_global_setting(name: str, t: Type[T] = str) -> T:
     return value
 
 
+def input_dialog(heading: str) -> str:
+    """Display a keyboard input dialog and return the text entered."""
+    import xbmcgui
+
+    return xbmcgui.Dialog().input(heading)
+
+
+def invalidate_addon_settings(name: str = None) -> None:
+    """Read the given addon setting, or all of them, from Kodi again on next access."""
+    _SETTINGS.invalidate(name)
+
+
 def localize(string_id: int, **kwargs) -> str:
     """Return the translated string from the .po language files, optionally translating variables."""
     if not isinstance(string_id, int) and not string_id.isdecimal():
@@ -92,18 +148,72 @@ def localize(string_id: int, **kwargs) -> str:
 
 def ok_dialog(msg: str) -> None:
     """Display a popup window with a button."""
+    import xbmcgui
+
     xbmcgui.Dialog().ok(get_addon_info("name"), msg)
 
 
+def reload_addon() -> None:
+    """Get a new addon instance, reading settings again."""
+    global ADDON
+    ADDON = xbmcaddon.Addon()
+    _SETTINGS.invalidate()
+
+
 def set_addon_setting(name: str, value: T) -> None:
-    """Set addon setting from name."""
+    """Set addon setting from name, the value being written to Kodi on next flush."""
+    _SETTINGS.set(name, value)
+
+
+def _read_setting(name: str, t: Type[T]) -> T:
+    """Read addon setting from Kodi."""
+    if t is bool:
+        return ADDON.getSettings().getBool(name)
+
+    if t is int:
+        return ADDON.getSettings().getInt(name)
+
+    if t is dict:
+        try:
+            return json.loads(ADDON.getSettings().getString(name))
+        except json.decoder.JSONDecodeError:
+            return {}
+
+    return ADDON.getSettings().getString(name)
+
+
+def _parse_setting(value: str, t: Type[T]) -> T:
+    """Parse a setting string the way Kodi does."""
+    if t is bool:
+        return value == "true"
+
+    if t is int:
+        try:
+            return int(value)
+        except ValueError:
+            return 0
+
+    if t is dict:
+        try:
+            return json.loads(value)
+        except json.decoder.JSONDecodeError:
+            return {}
+
+    return value
+
+
+def _to_setting_string(value: T) -> str:
+    """Convert a value to the string stored by Kodi."""
     if isinstance(value, bool):
-        value = "true" if value else "false"
+        return "true" if value else "false"
 
     if isinstance(value, int):
-        value = str(value)
+        return str(value)
 
     if isinstance(value, dict):
-        value = json.dumps(value)
+        return json.dumps(value)
+
+    return value
+
 
-    ADDON.setSetting(name, value)
+_SETTINGS = SettingsStore()
@@ -0,0 +1,126 @@
+"""Cross-process locking utils."""
+
+import os
+import re
+import time
+from contextlib import suppress
+from threading import Event, Thread
+from typing import Callable, Optional, TypeVar
+
+import xbmc
+import xbmcvfs
+
+from lib.utils.kodi import get_addon_info, log
+
+T = TypeVar("T")
+
+
+class FileLock:
+    """Lock shared by every process of the addon, backed by a lock file created atomically.
+
+    While held, the modification time of the lock file is refreshed, so that it is only considered stale once its
+    holder stopped refreshing it, having died.
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, path: str, timeout: float = 30, stale_after: float = 60):
+        """Initialize File Lock object."""
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self._fd = None
+        self._released: Optional[Event] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Acquire the lock, waiting for its current holder when blocking."""
+        deadline = time.time() + self.timeout
+
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(self._fd, str(os.getpid()).encode())
+                self._released = Event()
+                Thread(target=self._refresh, args=(self._released,), daemon=True).start()
+                return True
+            except FileExistsError:
+                self._remove_if_stale()
+
+            if not blocking or time.time() > deadline:
+                return False
+
+            time.sleep(self.poll_interval)
+
+    def release(self) -> None:
+        """Release the lock."""
+        if self._fd is None:
+            return
+
+        self._released.set()
+        os.close(self._fd)
+        self._fd = None
+
+        with suppress(OSError):
+            os.remove(self.path)
+
+    def _refresh(self, released: Event) -> None:
+        """Refresh the modification time of the lock file until the lock is released."""
+        while not released.wait(self.stale_after / 3):
+            with suppress(OSError):
+                os.utime(self.path)
+
+    def _remove_if_stale(self) -> None:
+        """Remove the lock file left behind by a process which died while holding it."""
+        try:
+            if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                log(f"Removing stale lock {self.path}", xbmc.LOGWARNING)
+                os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "FileLock":
+        """Acquire the lock, or fail when it cannot be acquired in time."""
+        if not self.acquire():
+            raise TimeoutError(f"Cannot acquire lock {self.path}")
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Release the lock."""
+        self.release()
+
+
+def get_lock(name: str, **kwargs) -> FileLock:
+    """Get the lock with the given name, stored in the addon profile."""
+    lock_folder = os.path.join(xbmcvfs.translatePath(get_addon_info("profile")), "locks")
+
+    if not os.path.exists(lock_folder):
+        os.makedirs(lock_folder, exist_ok=True)
+
+    return FileLock(os.path.join(lock_folder, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.lock"), **kwargs)
+
+
+def single_flight(name: str, fetch: Callable[[], T], load: Callable[[], Optional[T]]) -> T:
+    """Run fetch in a single process at a time.
+
+    Processes which had to wait for another one to complete the same fetch first try to load its result, and only
+    fetch themselves when there is nothing to load.
+    """
+    lock = get_lock(name)
+
+    if lock.acquire(blocking=False):
+        try:
+            return fetch()
+        finally:
+            lock.release()
+
+    log(f"Waiting for {name} to be fetched by another process", xbmc.LOGDEBUG)
+
+    if not lock.acquire():
+        log(f"Timeout while waiting for {name}, fetching anyway", xbmc.LOGWARNING)
+        return fetch()
+
+    try:
+        result = load()
+        return result if result is not None else fetch()
+    finally:
+        lock.release()
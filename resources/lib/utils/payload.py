@@ -0,0 +1,142 @@
+"""Serialized payloads sent to sockets."""
+
+import json
+import os
+import socket
+import tempfile
+from contextlib import suppress
+from hashlib import sha1
+from typing import Callable, Iterable, Iterator, Optional
+
+import xbmc
+import xbmcvfs
+
+from lib.utils.kodi import get_addon_info, log
+
+# Size (in bytes) of the chunks in which encoded payloads are written
+_CHUNK_SIZE = 64 * 1024
+
+_ENCODER = json.JSONEncoder()
+
+
+class Payload:
+    """JSON document identified by the hash of the content it is built from.
+
+    The document is only encoded by calling encode, which yields it in pieces, when its stored copy is outdated.
+    """
+
+    __slots__ = ("name", "revision", "encode")
+
+    def __init__(self, name: str, revision: str, encode: Callable[[], Iterable[str]]):
+        """Initialize Payload object."""
+        self.name = name
+        self.revision = revision
+        self.encode = encode
+
+
+class PayloadStore:
+    """Keep the last payload of each name in the addon profile, with the revision it was built from.
+
+    A payload whose revision is unchanged is sent from its file with socket.sendfile, without being encoded or copied
+    in memory. Otherwise, it is encoded in chunks which are sent to the socket while being written to a new file, so
+    that the whole document is never built.
+    """
+
+    def __init__(self, folder: str):
+        """Initialize Payload Store object."""
+        self.folder = folder
+
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+
+    def send(self, sock: socket.socket, payload: Payload) -> None:
+        """Send a payload to a connected socket, storing it when it is outdated."""
+        filepath = os.path.join(self.folder, f"{payload.name}.json")
+        revision_filepath = f"{filepath}.sha1"
+
+        if self._read_revision(revision_filepath) == payload.revision and os.path.exists(filepath):
+            log(f"Sending stored {payload.name} payload", xbmc.LOGDEBUG)
+
+            with open(filepath, "rb") as file:
+                sock.sendfile(file)
+            return
+
+        log(f"Sending and storing {payload.name} payload", xbmc.LOGDEBUG)
+
+        # The revision is removed first, so that it never describes a payload file being replaced
+        with suppress(OSError):
+            os.remove(revision_filepath)
+
+        fd, temp_filepath = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in _iter_chunks(payload.encode()):
+                    sock.sendall(chunk)
+                    file.write(chunk)
+            os.replace(temp_filepath, filepath)
+        except BaseException:
+            os.remove(temp_filepath)
+            raise
+
+        try:
+            with open(revision_filepath, "w", encoding="utf-8") as file:
+                file.write(payload.revision)
+        except OSError as e:
+            log(f"Cannot store {payload.name} payload revision: {e}", xbmc.LOGWARNING)
+
+    @staticmethod
+    def _read_revision(filepath: str) -> Optional[str]:
+        """Read the revision of a stored payload, None when there is none."""
+        try:
+            with open(filepath, encoding="utf-8") as file:
+                return file.read()
+        except OSError:
+            return None
+
+
+def hash_revision(parts: Iterable[str]) -> str:
+    """Hash the parts of the content a payload is built from into its revision."""
+    digest = sha1()
+
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+def iter_json(value) -> Iterator[str]:
+    """Encode a value as JSON in pieces."""
+    return _ENCODER.iterencode(value)
+
+
+def _iter_chunks(pieces: Iterable[str]) -> Iterator[bytes]:
+    """Group encoded pieces into UTF-8 chunks of about _CHUNK_SIZE bytes."""
+    buffer = []
+    size = 0
+
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+
+        if size >= _CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+
+    if len(buffer) > 0:
+        yield "".join(buffer).encode("utf-8")
+
+
+_PAYLOAD_STORE: Optional[PayloadStore] = None
+
+
+def get_payload_store() -> PayloadStore:
+    """Get the payload store of the addon profile."""
+    global _PAYLOAD_STORE
+
+    if _PAYLOAD_STORE is None:
+        _PAYLOAD_STORE = PayloadStore(os.path.join(xbmcvfs.translatePath(get_addon_info("profile")), "cache", "iptv"))
+
+    return _PAYLOAD_STORE
@@ -0,0 +1,211 @@
+"""Compact catalog records."""
+
+from sys import intern
+from typing import Any, Dict, List, Optional
+
+from lib.utils.kodi import build_addon_url
+
+
+def _intern(value: Any) -> Any:
+    """Intern strings shared by many records, like the radio of podcasts or the logo of the shows of a podcast."""
+    return intern(value) if isinstance(value, str) else value
+
+
+class Record:
+    """Catalog record, rendered as a directory item.
+
+    Records only hold their catalog fields, in slots: the label, path and thumb of the directory item are derived from
+    them on access, so that plugin URLs are only built for the items actually rendered.
+    """
+
+    __slots__ = ()
+
+    kind = ""
+    is_folder = False
+    thumb: Optional[str] = None
+    duration: Optional[int] = None
+
+    def to_json(self) -> list:
+        """Serialize the record as a list of its type name and fields."""
+        return [type(self).__name__, *(getattr(self, field) for field in self.__slots__)]
+
+    def __eq__(self, other: object) -> bool:
+        """Compare records field by field."""
+        return type(self) is type(other) and self.to_json() == other.to_json()
+
+    def __repr__(self) -> str:
+        """Represent the record with its fields."""
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Radio(Record):
+    """Live radio."""
+
+    __slots__ = ("slug", "name", "logo")
+
+    kind = "radio"
+
+    def __init__(self, slug: str, name: str, logo: Optional[str]):
+        """Initialize Radio object."""
+        self.slug = slug
+        self.name = name
+        self.logo = logo
+
+    @property
+    def label(self) -> str:
+        """Label of the directory item."""
+        return self.name
+
+    @property
+    def thumb(self) -> Optional[str]:
+        """Thumb of the directory item."""
+        return self.logo
+
+    @property
+    def path(self) -> str:
+        """Plugin URL playing the radio."""
+        return build_addon_url(f"/stream/live/{self.slug}")
+
+
+class Podcast(Record):
+    """Podcast of a radio, podcasts without radio having an empty radio slug."""
+
+    __slots__ = ("slug", "name", "logo", "radio_slug", "radio_name", "radio_logo")
+
+    kind = "podcast"
+    is_folder = True
+
+    def __init__(
+        self,
+        slug: str,
+        name: str,
+        logo: Optional[str],
+        radio_slug: str,
+        radio_name: Optional[str] = None,
+        radio_logo: Optional[str] = None,
+    ):
+        """Initialize Podcast object."""
+        self.slug = slug
+        self.name = name
+        self.logo = logo
+        self.radio_slug = _intern(radio_slug)
+        self.radio_name = _intern(radio_name)
+        self.radio_logo = _intern(radio_logo)
+
+    @property
+    def label(self) -> str:
+        """Label of the directory item."""
+        return self.name
+
+    @property
+    def thumb(self) -> Optional[str]:
+        """Thumb of the directory item."""
+        return self.logo
+
+    @property
+    def path(self) -> str:
+        """Plugin URL listing the shows of the podcast."""
+        return build_addon_url(f"/podcasts/{self.radio_slug or 'other'}/{self.slug}")
+
+
+class PodcastGroup(Record):
+    """Radio grouping podcasts, podcasts without radio being grouped under an empty radio slug."""
+
+    __slots__ = ("radio_slug", "radio_name", "radio_logo", "podcast_count")
+
+    kind = "podcast_group"
+    is_folder = True
+
+    def __init__(self, radio_slug: str, radio_name: Optional[str], radio_logo: Optional[str], podcast_count: int):
+        """Initialize Podcast Group object."""
+        self.radio_slug = _intern(radio_slug)
+        self.radio_name = _intern(radio_name)
+        self.radio_logo = _intern(radio_logo)
+        self.podcast_count = podcast_count
+
+    @property
+    def label(self) -> str:
+        """Label of the directory item."""
+        return self.radio_name if self.radio_slug != "" else "Other"
+
+    @property
+    def thumb(self) -> Optional[str]:
+        """Thumb of the directory item."""
+        return self.radio_logo
+
+    @property
+    def path(self) -> str:
+        """Plugin URL listing the podcasts of the radio."""
+        return build_addon_url(f"/podcasts/{self.radio_slug or 'other'}")
+
+
+class Show(Record):
+    """Podcast show."""
+
+    __slots__ = ("slug", "name", "logo", "duration")
+
+    kind = "show"
+
+    def __init__(self, slug: str, name: str, logo: Optional[str], duration: Optional[int]):
+        """Initialize Show object."""
+        self.slug = slug
+        self.name = name
+        self.logo = _intern(logo)
+        self.duration = duration
+
+    @property
+    def label(self) -> str:
+        """Label of the directory item."""
+        return self.name
+
+    @property
+    def thumb(self) -> Optional[str]:
+        """Thumb of the directory item."""
+        return self.logo
+
+    @property
+    def path(self) -> str:
+        """Plugin URL playing the show."""
+        return build_addon_url(f"/stream/podcast/{self.slug}")
+
+
+class Link(Record):
+    """Directory item which is not a catalog entry, like search results or the next page."""
+
+    __slots__ = ("label", "path", "thumb", "is_folder")
+
+    kind = "link"
+
+    def __init__(self, label: str, path: str, thumb: Optional[str] = None, is_folder: bool = True):
+        """Initialize Link object."""
+        self.label = label
+        self.path = path
+        self.thumb = thumb
+        self.is_folder = is_folder
+
+
+class StreamInfo:
+    """Stream to play."""
+
+    __slots__ = ("path", "mime_type")
+
+    def __init__(self, path: Optional[str] = None, mime_type: Optional[str] = None):
+        """Initialize Stream Info object."""
+        self.path = path
+        self.mime_type = mime_type
+
+
+_RECORD_TYPES: Dict[str, type] = {
+    record_type.__name__: record_type for record_type in (Radio, Podcast, PodcastGroup, Show, Link)
+}
+
+
+def dump_records(records: List[Record]) -> List[list]:
+    """Serialize records as JSON compatible lists."""
+    return [record.to_json() for record in records]
+
+
+def load_records(data: List[list]) -> List[Record]:
+    """Deserialize records serialized by dump_records."""
+    return [_RECORD_TYPES[type_name](*fields) for type_name, *fields in data]
@@ -1,15 +1,27 @@
 """Request utils."""
 
+import json
+import time
+from hashlib import sha1
 from random import randint
-from typing import Mapping, Union
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Mapping, Tuple, Union
+from urllib.parse import urlsplit
 
 import xbmc
-from requests import Response, Session
-from requests.exceptions import JSONDecodeError, RequestException
 
 # from socks import SOCKS5
 # from sockshandler import SocksiPyHandler
+from lib.utils.http_cache import HTTPCache, HTTPCacheEntry, get_http_cache, get_max_age
+from lib.utils.instrumentation import record_cache, record_http
+from lib.utils.json_stream import JSONArrayStream
 from lib.utils.kodi import get_addon_setting, log
+from lib.utils.lock import single_flight
+from lib.utils.state import get_process_state
+
+# requests takes a significant share of the startup time and is only imported once a request is actually sent
+if TYPE_CHECKING:
+    from requests import Response, Session
 
 _USER_AGENTS = [
     # Chrome
@@ -30,14 +42,101 @@ _USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_13_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.1.2 Safari/605.1.1",  # noqa: E501
 ]
 
+# Size (in bytes) of the chunks in which streamed responses are read
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+_SESSIONS: Dict[str, "Session"] = {}
+_SESSIONS_LOCK = Lock()
+
 
 def get_random_ua() -> str:
     """Get a randomised user agent."""
     return _USER_AGENTS[randint(0, len(_USER_AGENTS) - 1)]
 
 
-def request(method: str, url: str, headers: Mapping[str, str] = None, data=None, s: Session = None) -> Response:
-    """Send HTTP request using requests."""
+def get_session(url: str) -> "Session":
+    """Get the pooled keep-alive session for the host of the given URL."""
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+
+    host = urlsplit(url).netloc
+
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(host)
+
+        if session is None:
+            adapter = HTTPAdapter(
+                pool_connections=max(1, get_addon_setting("network.pool_size", int)),
+                pool_maxsize=max(1, get_addon_setting("network.max_connections_per_host", int)),
+                pool_block=True,
+            )
+            session = Session()
+            session.headers.update({"Connection": "keep-alive"})
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSIONS[host] = session
+
+    return session
+
+
+def get_connection_stats() -> Dict[str, int]:
+    """Count connections opened and reused by the pooled sessions."""
+    stats = {"opened": 0, "reused": 0}
+
+    with _SESSIONS_LOCK:
+        sessions = list(_SESSIONS.values())
+
+    if len(sessions) == 0:
+        return stats
+
+    from requests.adapters import HTTPAdapter
+
+    for session in sessions:
+        for adapter in set(session.adapters.values()):
+            if not isinstance(adapter, HTTPAdapter):
+                continue
+
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                stats["opened"] += pool.num_connections
+                stats["reused"] += max(0, pool.num_requests - pool.num_connections)
+
+    return stats
+
+
+def close_sessions() -> None:
+    """Close every pooled session and their connections."""
+    with _SESSIONS_LOCK:
+        sessions = list(_SESSIONS.values())
+        _SESSIONS.clear()
+
+    for session in sessions:
+        session.close()
+
+
+get_process_state().on_invalidate(close_sessions)
+
+
+def request(
+    method: str,
+    url: str,
+    headers: Mapping[str, str] = None,
+    data=None,
+    s: "Session" = None,
+    timeout: Union[float, Tuple[float, float]] = None,
+    stream: bool = False,
+    retries: int = None,
+    hedge: bool = None,
+) -> "Response":
+    """Send HTTP request using requests, with the resilience policy configured in settings.
+
+    The given timeout, retries and hedging override the policy. Failures are raised as RequestException,
+    CircuitOpenError being raised without sending anything while too many requests to the host failed in a row.
+    """
+    from lib.utils.resilience import send_with_policy
+
     if headers is None:
         headers = {}
 
@@ -50,23 +149,164 @@ def request(method: str, url: str, headers: Mapping[str, str] = None, data=None,
         **headers,
     }
 
-    s = s if s is not None else Session()
+    s = s if s is not None else get_session(url)
+
+    def send(attempt_timeout: Tuple[float, float]) -> "Response":
+        log(f"Fetching {url}", xbmc.LOGDEBUG)
+        start = time.perf_counter()
+        res = s.request(method, url, headers=headers, data=data, timeout=attempt_timeout, stream=stream)
+        record_http(method, url, res.status_code, 0 if stream else len(res.content), time.perf_counter() - start)
+        log(f" -> {res.status_code}", xbmc.LOGDEBUG)
+        return res
+
+    return send_with_policy(method, urlsplit(url).netloc, send, timeout, retries, hedge)
+
+
+def request_json(
+    url: str,
+    headers: Mapping[str, str] = None,
+    default: Union[dict, list] = None,
+    cache_ttl: int = None,
+    revalidate: bool = False,
+) -> Union[dict, list]:
+    """Send HTTP request and load json response.
+
+    When cache_ttl is set, the response is stored in the HTTP cache: fresh entries are served without any request,
+    stale entries are revalidated with their ETag / Last-Modified and served locally on 304 Not Modified. Setting
+    revalidate forces fresh entries to be revalidated too, which is used to warm the cache in the background.
+
+    Authentication failures (401 / 403) are raised as HTTPError, any other failure serves the cached response even if
+    stale, or returns default when nothing is cached.
+    """
+    if cache_ttl is None:
+        return _fetch_json(url, headers, default)
+
+    cache = get_http_cache()
+    entry = cache.get(url)
+
+    if entry is not None and entry.is_fresh() and not revalidate:
+        log(f"Serving {url} from HTTP cache", xbmc.LOGDEBUG)
+        record_cache(url, "hit")
+        return json.loads(entry.body)
+
+    def load_fresh() -> Union[dict, list, None]:
+        fresh_entry = cache.get(url)
+        return json.loads(fresh_entry.body) if fresh_entry is not None and fresh_entry.is_fresh() else None
+
+    return single_flight(
+        f"http-{sha1(url.encode('utf-8')).hexdigest()}",
+        lambda: _fetch_json(url, headers, default, cache, entry, cache_ttl),
+        load_fresh,
+    )
+
 
-    log(f"Fetching {url}", xbmc.LOGDEBUG)
-    res = s.request(method, url, headers=headers, data=data)
-    res.raise_for_status()
-    log(f" -> {res.status_code}", xbmc.LOGDEBUG)
-    return res
+def request_json_items(
+    url: str,
+    headers: Mapping[str, str] = None,
+    fields: List[str] = None,
+    key: str = "result",
+    cache_ttl: int = None,
+    revalidate: bool = False,
+) -> JSONArrayStream:
+    """Send HTTP request and decode the items of an array of the json response while the response is being read.
 
+    The HTTP cache is used like request_json does, bodies being read from and written to the cache in chunks.
+    Concurrent requests of the same URL are not merged here: callers refreshing a dataset merge them per dataset.
+
+    Authentication failures (401 / 403) are raised as HTTPError and any other failure to send the request streams the
+    cached response even if stale, or an empty stream when nothing is cached, while failures to read or decode the
+    response are raised when iterating.
+    """
+    from requests.exceptions import HTTPError, RequestException
+
+    cache = get_http_cache() if cache_ttl is not None else None
+    cached = cache.iter_body(url) if cache is not None else None
+    entry, cached_body = cached if cached is not None else (None, None)
+
+    if entry is not None and entry.is_fresh() and not revalidate:
+        log(f"Serving {url} from HTTP cache", xbmc.LOGDEBUG)
+        record_cache(url, "hit")
+        return JSONArrayStream(cached_body, key, fields)
+
+    headers = dict(headers or {})
+
+    if entry is not None:
+        headers.update(entry.conditional_headers())
+
+    try:
+        res = request("GET", url, headers=headers, stream=True)
+    except HTTPError as e:
+        if e.response is not None and e.response.status_code in [401, 403]:
+            raise
+        log(e, xbmc.LOGWARNING)
+        return _serve_stale_items(url, cached_body, key, fields)
+    except RequestException as e:
+        log(e, xbmc.LOGWARNING)
+        return _serve_stale_items(url, cached_body, key, fields)
+
+    if res.status_code == 304 and entry is not None:
+        record_cache(url, "revalidated")
+        res.close()
+        max_age = get_max_age(res.headers)
+        entry.expires = time.time() + (max_age if max_age is not None else cache_ttl)
+        return JSONArrayStream(cache.set_stream(entry, cached_body), key, fields)
+
+    chunks = _iter_content(res)
+
+    if cache is not None:
+        record_cache(url, "miss")
+        max_age = get_max_age(res.headers)
+        etag = res.headers.get("ETag")
+        last_modified = res.headers.get("Last-Modified")
+
+        if etag is not None or last_modified is not None or cache_ttl > 0:
+            expires = time.time() + (max_age if max_age is not None else cache_ttl)
+            chunks = cache.set_stream(HTTPCacheEntry(url, None, etag, last_modified, expires), chunks)
+
+    return JSONArrayStream(chunks, key, fields)
+
+
+def _iter_content(res: "Response") -> Iterator[bytes]:
+    """Read a streamed response in chunks, closing it once read, on failure or when reading stops early."""
+    try:
+        yield from res.iter_content(_STREAM_CHUNK_SIZE)
+    finally:
+        res.close()
+
+
+def _fetch_json(
+    url: str,
+    headers: Mapping[str, str],
+    default: Union[dict, list],
+    cache: HTTPCache = None,
+    entry: HTTPCacheEntry = None,
+    cache_ttl: int = 0,
+) -> Union[dict, list]:
+    """Send HTTP request, conditional if a cache entry is given, and load json response."""
+    from requests.exceptions import HTTPError, JSONDecodeError, RequestException
+
+    headers = dict(headers or {})
+
+    if entry is not None:
+        headers.update(entry.conditional_headers())
 
-def request_json(url: str, headers: Mapping[str, str] = None, default: Union[dict, list] = None) -> Union[dict, list]:
-    """Send HTTP request and load json response."""
     try:
         res = request("GET", url, headers=headers)
-        res.raise_for_status()
+    except HTTPError as e:
+        if e.response is not None and e.response.status_code in [401, 403]:
+            raise
+        log(e, xbmc.LOGWARNING)
+        return _serve_stale(url, entry, default)
     except RequestException as e:
         log(e, xbmc.LOGWARNING)
-        return default
+        return _serve_stale(url, entry, default)
+
+    if res.status_code == 304 and entry is not None:
+        record_cache(url, "revalidated")
+        max_age = get_max_age(res.headers)
+        entry.expires = time.time() + (max_age if max_age is not None else cache_ttl)
+        cache.set(entry)
+        return json.loads(entry.body)
 
     try:
         content = res.json()
@@ -75,9 +315,39 @@ def request_json(url: str, headers: Mapping[str, str] = None, default: Union[dic
         log(res.text, xbmc.LOGDEBUG)
         return default
 
+    if cache is not None:
+        record_cache(url, "miss")
+        max_age = get_max_age(res.headers)
+        etag = res.headers.get("ETag")
+        last_modified = res.headers.get("Last-Modified")
+
+        if etag is not None or last_modified is not None or cache_ttl > 0:
+            expires = time.time() + (max_age if max_age is not None else cache_ttl)
+            cache.set(HTTPCacheEntry(url, res.text, etag, last_modified, expires))
+
     return content
 
 
+def _serve_stale(url: str, entry: HTTPCacheEntry, default: Union[dict, list]) -> Union[dict, list]:
+    """Serve the cached response of a failed request even if stale, or default when nothing is cached."""
+    if entry is None:
+        return default
+
+    log(f"Serving stale {url} from HTTP cache", xbmc.LOGINFO)
+    record_cache(url, "stale")
+    return json.loads(entry.body)
+
+
+def _serve_stale_items(url: str, cached_body: Iterable[bytes], key: str, fields: List[str]) -> JSONArrayStream:
+    """Stream the cached response of a failed request even if stale, or an empty stream when nothing is cached."""
+    if cached_body is None:
+        return JSONArrayStream([b"{}"], key, fields)
+
+    log(f"Serving stale {url} from HTTP cache", xbmc.LOGINFO)
+    record_cache(url, "stale")
+    return JSONArrayStream(cached_body, key, fields)
+
+
 def to_cookie_string(cookies: dict, pick: list = None) -> str:
     """Convert cookies to cookie string."""
     if pick is None:
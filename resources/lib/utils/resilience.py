@@ -0,0 +1,302 @@
+"""Resilience policy of HTTP requests: timeouts, retries, hedging and circuit breaking.
+
+This module imports requests, so it is only imported by the request layer once a request is actually sent.
+"""
+
+import random
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Lock
+from typing import Callable, Deque, Dict, Optional, Tuple, Union
+
+import xbmc
+from requests import Response
+from requests.exceptions import ConnectionError, HTTPError, RequestException, Timeout
+
+from lib.utils.instrumentation import get_percentile, record_latency, record_resilience
+from lib.utils.kodi import get_addon_setting, log
+from lib.utils.state import get_process_state
+
+# Methods which can be sent again without side effects
+_IDEMPOTENT_METHODS = ["GET", "HEAD"]
+
+# Statuses worth retrying, sent by overloaded or restarting servers
+_RETRYABLE_STATUSES = [429, 500, 502, 503, 504]
+
+# Delays (in seconds) of the first retry and of any retry at most, before jitter
+_BACKOFF_BASE = 0.5
+_BACKOFF_MAX = 8
+
+# Number of latencies kept per host, and needed before hedging requests to the host
+_LATENCY_WINDOW = 200
+_MIN_LATENCY_SAMPLES = 20
+
+# Number of hedged requests sent concurrently at most
+_HEDGE_WORKERS = 8
+
+
+class CircuitOpenError(ConnectionError):
+    """The circuit breaker of the host is open: the request has not been sent."""
+
+
+class RequestPolicy:
+    """Timeouts, retries, hedging and circuit breaking applied to requests."""
+
+    def __init__(
+        self,
+        connect_timeout: float,
+        read_timeout: float,
+        retries: int,
+        hedge: bool,
+        hedge_percentile: int,
+        breaker_threshold: int,
+        breaker_cooldown: float,
+    ):
+        """Initialize Request Policy object."""
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+
+    @classmethod
+    def from_settings(cls) -> "RequestPolicy":
+        """Build the policy configured in addon settings."""
+        return cls(
+            connect_timeout=max(1, get_addon_setting("network.connect_timeout", int)),
+            read_timeout=max(1, get_addon_setting("network.read_timeout", int)),
+            retries=max(0, get_addon_setting("network.retries", int)),
+            hedge=get_addon_setting("network.hedge_requests", bool),
+            hedge_percentile=min(99, max(50, get_addon_setting("network.hedge_percentile", int))),
+            breaker_threshold=max(0, get_addon_setting("network.breaker_threshold", int)),
+            breaker_cooldown=max(1, get_addon_setting("network.breaker_cooldown", int)),
+        )
+
+    def get_backoff(self, retry: int) -> float:
+        """Get the delay before the given retry, counted from 0: exponential backoff with full jitter."""
+        return random.uniform(0, min(_BACKOFF_MAX, _BACKOFF_BASE * 2**retry))
+
+
+class CircuitBreaker:
+    """Stop sending requests to a host after consecutive failures, letting a single trial request through once cooled.
+
+    A threshold of 0 disables the breaker.
+    """
+
+    def __init__(self, threshold: int, cooldown: float, clock: Callable[[], float] = time.monotonic):
+        """Initialize Circuit Breaker object."""
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = Lock()
+
+    def allow(self) -> bool:
+        """Tell whether a request can be sent, switching to half-open once the cooldown is over."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+
+            if self._trial or self.clock() - self.opened_at < self.cooldown:
+                return False
+
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        """Close the breaker."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the breaker again when the threshold is reached or a trial request failed."""
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+
+            if self.threshold > 0 and self.failures >= self.threshold:
+                if self.opened_at is None:
+                    log(f"Opening circuit breaker after {self.failures} failures", xbmc.LOGWARNING)
+                self.opened_at = self.clock()
+
+
+class LatencyTracker:
+    """Keep the most recent response latencies of a host to compute percentiles."""
+
+    def __init__(self, window: int = _LATENCY_WINDOW):
+        """Initialize Latency Tracker object."""
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = Lock()
+
+    def add(self, latency: float) -> None:
+        """Record a latency (in seconds)."""
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, percentile: int) -> Optional[float]:
+        """Get the latency percentile, None until enough latencies are recorded."""
+        with self._lock:
+            latencies = list(self._latencies)
+
+        return get_percentile(latencies, percentile) if len(latencies) >= _MIN_LATENCY_SAMPLES else None
+
+
+_POLICY: Optional[RequestPolicy] = None
+_HOSTS: Dict[str, Tuple[CircuitBreaker, LatencyTracker]] = {}
+_HOSTS_LOCK = Lock()
+_HEDGE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def get_request_policy() -> RequestPolicy:
+    """Get the policy configured in addon settings."""
+    global _POLICY
+
+    if _POLICY is None:
+        _POLICY = RequestPolicy.from_settings()
+
+    return _POLICY
+
+
+def _get_host(host: str, policy: RequestPolicy) -> Tuple[CircuitBreaker, LatencyTracker]:
+    """Get the circuit breaker and latency tracker of a host."""
+    with _HOSTS_LOCK:
+        if host not in _HOSTS:
+            _HOSTS[host] = (CircuitBreaker(policy.breaker_threshold, policy.breaker_cooldown), LatencyTracker())
+
+        return _HOSTS[host]
+
+
+def _reset() -> None:
+    """Drop the policy and the state of every host, so that they are created again with the current settings."""
+    global _POLICY
+    _POLICY = None
+
+    with _HOSTS_LOCK:
+        _HOSTS.clear()
+
+
+get_process_state().on_invalidate(_reset)
+
+
+def send_with_policy(
+    method: str,
+    host: str,
+    send: Callable[[Union[float, Tuple[float, float]]], Response],
+    timeout: Union[float, Tuple[float, float]] = None,
+    retries: int = None,
+    hedge: bool = None,
+) -> Response:
+    """Send a request with the configured policy, the given timeout, retries and hedging overriding it.
+
+    Requests are only retried and hedged when idempotent. Connection errors, timeouts and retryable statuses are
+    retried with exponential backoff and jitter, failed responses being closed first, and count as failures of the
+    circuit breaker of the host. While the breaker is open, CircuitOpenError is raised without sending anything, so
+    that callers fall back to cached data. The latency of the successful attempt, excluding earlier attempts and their
+    backoff, is recorded for hedging.
+    """
+    policy = get_request_policy()
+    breaker, latencies = _get_host(host, policy)
+    idempotent = method.upper() in _IDEMPOTENT_METHODS
+    timeout = timeout if timeout is not None else (policy.connect_timeout, policy.read_timeout)
+    retries = (retries if retries is not None else policy.retries) if idempotent else 0
+    hedge = (hedge if hedge is not None else policy.hedge) and idempotent
+    error: Optional[RequestException] = None
+
+    for attempt in range(retries + 1):
+        if attempt > 0:
+            record_resilience("retries")
+            time.sleep(policy.get_backoff(attempt - 1))
+
+        if not breaker.allow():
+            record_resilience("rejected")
+            raise CircuitOpenError(f"Circuit breaker open for {host}")
+
+        hedge_delay = latencies.percentile(policy.hedge_percentile) if hedge else None
+        start = time.perf_counter()
+
+        try:
+            res = _send_hedged(lambda: send(timeout), hedge_delay) if hedge_delay is not None else send(timeout)
+            res.raise_for_status()
+        except (ConnectionError, Timeout) as e:
+            breaker.record_failure()
+            error = e
+        except HTTPError as e:
+            # Failed responses may be streamed: they are closed, so that their pooled connection is released before
+            # retrying or raising, the status staying readable by callers
+            if e.response is not None:
+                e.response.close()
+
+            if e.response is None or e.response.status_code not in _RETRYABLE_STATUSES:
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            error = e
+        else:
+            breaker.record_success()
+            latency = time.perf_counter() - start
+            latencies.add(latency)
+            record_latency(latency)
+            return res
+
+        log(f"Attempt {attempt + 1} / {retries + 1} failed: {error}", xbmc.LOGDEBUG)
+
+    raise error
+
+
+def _send_hedged(send: Callable[[], Response], hedge_delay: float) -> Response:
+    """Send a request, and a second one when the first gets no response within the delay, using the first response.
+
+    The response of the losing request is closed once received.
+    """
+    executor = _get_hedge_executor()
+    first = executor.submit(send)
+
+    try:
+        return first.result(timeout=hedge_delay)
+    except FutureTimeoutError:
+        pass
+
+    record_resilience("hedged")
+    second = executor.submit(send)
+    pending = {first, second}
+
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        winner = next((future for future in done if future.exception() is None), None)
+
+        if winner is not None:
+            if winner is second:
+                record_resilience("hedge_wins")
+
+            for future in {first, second} - {winner}:
+                future.add_done_callback(_close_response)
+
+            return winner.result()
+
+        if len(pending) == 0:
+            return first.result()
+
+
+def _close_response(future: Future) -> None:
+    """Close the response of a request which lost the race against its hedged request."""
+    if future.exception() is None:
+        future.result().close()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    """Get the executor sending hedged requests."""
+    global _HEDGE_EXECUTOR
+
+    with _HOSTS_LOCK:
+        if _HEDGE_EXECUTOR is None:
+            _HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=_HEDGE_WORKERS, thread_name_prefix="hedge")
+
+        return _HEDGE_EXECUTOR
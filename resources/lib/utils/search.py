@@ -0,0 +1,134 @@
+"""Search index."""
+
+import os
+import re
+import sqlite3
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import List, Optional
+
+import xbmc
+import xbmcvfs
+
+from lib.utils.kodi import get_addon_info, log
+from lib.utils.records import Record
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    label TEXT,
+    path TEXT,
+    thumb TEXT,
+    is_folder INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_dataset ON documents (dataset);
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT NOT NULL,
+    document_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tokens_token ON tokens (token);
+CREATE INDEX IF NOT EXISTS tokens_document ON tokens (document_id);
+"""
+
+_DOCUMENT_COLUMNS = ["kind", "slug", "label", "path", "thumb", "is_folder"]
+
+
+def normalize(text: str) -> str:
+    """Remove accents and case from text."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized tokens."""
+    return re.findall(r"\w+", normalize(text))
+
+
+class SearchIndex:
+    """Accent-insensitive token prefix index over catalog labels, stored in SQLite.
+
+    Documents are grouped by catalog dataset, so each catalog refresh only replaces the documents of its dataset.
+    """
+
+    max_results = 200
+
+    def __init__(self, filepath: str):
+        """Initialize Search Index object."""
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._connection = sqlite3.connect(filepath, timeout=10, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+
+    def index_dataset(self, dataset: str, documents: List[Record]) -> None:
+        """Replace the documents of the dataset by the given records."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM tokens WHERE document_id IN (SELECT id FROM documents WHERE dataset = ?)", (dataset,)
+            )
+            self._connection.execute("DELETE FROM documents WHERE dataset = ?", (dataset,))
+
+            for document in documents:
+                cursor = self._connection.execute(
+                    f"INSERT INTO documents (dataset, {', '.join(_DOCUMENT_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (dataset, *(getattr(document, column) for column in _DOCUMENT_COLUMNS)),
+                )
+                self._connection.executemany(
+                    "INSERT INTO tokens (token, document_id) VALUES (?, ?)",
+                    ((token, cursor.lastrowid) for token in set(tokenize(document.label))),
+                )
+
+        log(f"{len(documents)} documents indexed for {dataset}", xbmc.LOGDEBUG)
+
+    def index_dataset_async(self, dataset: str, documents: List[Record]) -> None:
+        """Replace the documents of the dataset in a background thread."""
+        self._executor.submit(self.index_dataset, dataset, documents)
+
+    def search(self, query: str) -> List[dict]:
+        """Find documents having a token starting with each token of the query."""
+        tokens = sorted(set(tokenize(query)), key=len, reverse=True)
+
+        if len(tokens) == 0:
+            return []
+
+        matches = " INTERSECT ".join(["SELECT document_id FROM tokens WHERE token >= ? AND token < ?"] * len(tokens))
+        query = (
+            f"SELECT {', '.join(_DOCUMENT_COLUMNS)} FROM documents WHERE id IN ({matches} LIMIT ?)"
+            " ORDER BY CASE kind WHEN 'radio' THEN 0 WHEN 'podcast' THEN 1 ELSE 2 END, label"
+        )
+        params = [bound for token in tokens for bound in (token, f"{token}\uffff")]
+
+        with self._lock:
+            rows = self._connection.execute(query, (*params, self.max_results * 2)).fetchall()
+
+        documents = {}
+
+        for row in rows:
+            documents.setdefault((row["kind"], row["slug"]), dict(row))
+
+        return list(documents.values())[: self.max_results]
+
+
+_SEARCH_INDEX: Optional[SearchIndex] = None
+
+
+def get_search_index() -> SearchIndex:
+    """Get the search index of the addon profile."""
+    global _SEARCH_INDEX
+
+    if _SEARCH_INDEX is None:
+        profile_folder = xbmcvfs.translatePath(get_addon_info("profile"))
+
+        if not os.path.exists(profile_folder):
+            os.makedirs(profile_folder, exist_ok=True)
+
+        _SEARCH_INDEX = SearchIndex(os.path.join(profile_folder, "search.db"))
+
+    return _SEARCH_INDEX
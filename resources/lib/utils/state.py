@@ -0,0 +1,98 @@
+"""Process-level state shared by successive plugin invocations."""
+
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+import xbmc
+import xbmcvfs
+
+from lib.utils.kodi import get_addon_info, log, reload_addon
+
+
+class ProcessState:
+    """Hold the state worth keeping between plugin invocations running in the same Python interpreter.
+
+    With reuselanguageinvoker, Kodi runs successive invocations in the same interpreter, so module level objects like
+    pooled HTTP sessions, the access token or the catalog store connection stay warm. This container also keeps
+    recently built directory pages, and invalidates everything derived from settings when the user changes them.
+    """
+
+    page_ttl = 300
+    max_pages = 32
+
+    def __init__(self):
+        """Initialize Process State object."""
+        self.invocations = 0
+        self._lock = Lock()
+        self._pages: OrderedDict = OrderedDict()
+        self._settings_signature: Optional[Tuple[int, int]] = None
+        self._invalidation_callbacks: List[Callable[[], None]] = []
+
+    def begin_invocation(self) -> None:
+        """Start a new invocation, invalidating the state if settings changed since the previous one."""
+        self.invocations += 1
+        signature = _get_settings_signature()
+
+        if self._settings_signature is not None and signature != self._settings_signature:
+            log("Settings changed, invalidating process state", xbmc.LOGDEBUG)
+            self.invalidate()
+
+        self._settings_signature = signature
+
+    def end_invocation(self) -> None:
+        """End the invocation, so that settings written during it are not seen as a change by the next one."""
+        self._settings_signature = _get_settings_signature()
+
+    def on_invalidate(self, callback: Callable[[], None]) -> None:
+        """Register a function dropping state derived from settings."""
+        self._invalidation_callbacks.append(callback)
+
+    def invalidate(self) -> None:
+        """Drop cached pages and every state derived from settings."""
+        with self._lock:
+            self._pages.clear()
+
+        for callback in self._invalidation_callbacks:
+            callback()
+
+    def get_page(self, key: Hashable) -> Optional[Any]:
+        """Get a recently built directory page."""
+        with self._lock:
+            entry = self._pages.get(key)
+
+            if entry is None or entry[0] < time.time():
+                return None
+
+            self._pages.move_to_end(key)
+            return entry[1]
+
+    def set_page(self, key: Hashable, page: Any) -> None:
+        """Keep a directory page, evicting the least recently used pages."""
+        with self._lock:
+            self._pages[key] = (time.time() + self.page_ttl, page)
+            self._pages.move_to_end(key)
+
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+
+def _get_settings_signature() -> Optional[Tuple[int, int]]:
+    """Get the modification time and size of the settings file of the addon profile."""
+    try:
+        stat = os.stat(os.path.join(xbmcvfs.translatePath(get_addon_info("profile")), "settings.xml"))
+    except OSError:
+        return None
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+_PROCESS_STATE = ProcessState()
+_PROCESS_STATE.on_invalidate(reload_addon)
+
+
+def get_process_state() -> ProcessState:
+    """Get the state of the current Python interpreter."""
+    return _PROCESS_STATE
@@ -0,0 +1,124 @@
+"""Stream variant selection."""
+
+import re
+import time
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+import xbmc
+
+from lib.utils.catalog import get_catalog_store
+from lib.utils.kodi import get_addon_setting, log
+from lib.utils.records import StreamInfo
+from lib.utils.request import request
+
+_CODEC_MIME_TYPES = {
+    "aac": "audio/aac",
+    "aacp": "audio/aac",
+    "flac": "audio/flac",
+    "mp3": "audio/mpeg",
+    "ogg": "audio/ogg",
+    "opus": "audio/ogg",
+    "vorbis": "audio/ogg",
+}
+
+_TRANSPORT_MIME_TYPES = {
+    "hls": "application/vnd.apple.mpegurl",
+}
+
+_TRANSPORTS = ["http", "hls"]
+
+_BITRATE_PATTERN = re.compile(r"\s*\d+(\.\d+)?")
+
+# Time (in seconds) during which the probe result of a host is reused
+_HOST_PROBE_TTL = 24 * 3600
+
+
+def get_mime_type(stream: dict) -> str:
+    """Guess the MIME type of a stream variant from its transport and codec."""
+    if stream.get("transport") in _TRANSPORT_MIME_TYPES:
+        return _TRANSPORT_MIME_TYPES[stream.get("transport")]
+
+    return _CODEC_MIME_TYPES.get(str(stream.get("codec", "")).lower(), "audio/mpeg")
+
+
+def rank_streams(streams: List[dict], preferred_codec: str = "", highest_bitrate: bool = True) -> List[dict]:
+    """Sort supported stream variants by transport, preferred codec and bitrate."""
+
+    def score(stream: dict) -> tuple:
+        bitrate = _parse_bitrate(stream.get("bitrate"))
+        return (
+            _TRANSPORTS.index(stream["transport"]),
+            0 if preferred_codec and str(stream.get("codec", "")).lower() == preferred_codec else 1,
+            -bitrate if highest_bitrate else bitrate,
+        )
+
+    return sorted([stream for stream in streams if stream.get("transport") in _TRANSPORTS], key=score)
+
+
+def _parse_bitrate(value) -> float:
+    """Read the bitrate of a stream variant, e.g. 128, "128", "128.0" or "128k", 0 when it is not a number."""
+    match = _BITRATE_PATTERN.match(str(value or ""))
+    return float(match.group(0)) if match is not None else 0.0
+
+
+def probe_stream(url: str, timeout: float) -> Optional[dict]:
+    """Measure the time to get the response headers of a stream and read its content type."""
+    from requests.exceptions import RequestException
+
+    start = time.time()
+
+    try:
+        # A single attempt, so that the measured time is the time of the stream to start
+        res = request("GET", url, timeout=(timeout, timeout), stream=True, retries=0, hedge=False)
+        res.close()
+    except RequestException as e:
+        log(f"Probe of {url} failed: {e}", xbmc.LOGDEBUG)
+        return None
+
+    return {"connect_time": time.time() - start, "content_type": res.headers.get("Content-Type", "").split(";")[0]}
+
+
+def select_stream(streams: List[dict]) -> Optional[StreamInfo]:
+    """Select the stream variant to play according to user preferences and return its path and MIME type.
+
+    When probing is enabled, the best ranked variants are probed with a short request, unless their host has been
+    probed recently, and the variant starting the fastest is selected with the content type it actually sends.
+    """
+    ranked = rank_streams(
+        streams,
+        get_addon_setting("stream.preferred_codec").lower().replace("any", ""),
+        get_addon_setting("stream.highest_bitrate", bool),
+    )
+
+    if len(ranked) == 0:
+        return None
+
+    if not get_addon_setting("stream.probe", bool):
+        return StreamInfo(ranked[0]["url"], get_mime_type(ranked[0]))
+
+    catalog = get_catalog_store()
+    timeout = max(100, get_addon_setting("stream.probe_timeout", int)) / 1000
+    candidates = []
+
+    for position, stream in enumerate(ranked[:3]):
+        host = urlsplit(stream["url"]).netloc
+        connect_time = catalog.get_host_connect_time(host, _HOST_PROBE_TTL)
+        content_type = None
+
+        if connect_time is None:
+            probe = probe_stream(stream["url"], timeout)
+            connect_time = probe["connect_time"] if probe is not None else float("inf")
+            content_type = probe["content_type"] if probe is not None else None
+            catalog.set_host_connect_time(host, connect_time)
+
+        if connect_time != float("inf"):
+            candidates.append((connect_time, position, stream, content_type))
+
+    if len(candidates) == 0:
+        return StreamInfo(ranked[0]["url"], get_mime_type(ranked[0]))
+
+    _, _, stream, content_type = min(candidates, key=lambda candidate: candidate[:2])
+    log(f"Selected stream {stream['url']} ({content_type})", xbmc.LOGDEBUG)
+
+    return StreamInfo(stream["url"], content_type or get_mime_type(stream))
@@ -0,0 +1,146 @@
+"""Access token lifecycle."""
+
+import json
+import os
+import tempfile
+import time
+from base64 import urlsafe_b64decode
+from threading import Lock
+from typing import Callable, Optional
+
+import xbmc
+import xbmcvfs
+
+from lib.exceptions import AuthenticationRequired
+from lib.utils.kodi import get_addon_info, log
+from lib.utils.lock import single_flight
+
+
+def get_jwt_expiry(access_token: str) -> Optional[float]:
+    """Read the expiry timestamp of a JWT access token, if any."""
+    try:
+        payload = access_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(urlsafe_b64decode(payload)).get("exp"))
+    except (IndexError, TypeError, ValueError):
+        return None
+
+
+class TokenManager:
+    """Share a single access token between requests and refresh it before it expires.
+
+    The token is stored in its own file of the addon profile rather than in settings, so that refreshing it does not
+    look like a settings change to the processes keeping state derived from settings.
+    """
+
+    default_lifetime = 3600
+    refresh_margin = 60
+
+    def __init__(self, fetch_token: Callable[[], dict], name: str):
+        """Initialize Token Manager object."""
+        self._fetch_token = fetch_token
+        self._name = name
+        self._lock = Lock()
+        self._session_data: Optional[dict] = None
+
+    def get_token(self) -> str:
+        """Get a valid access token, refreshing it when it is about to expire."""
+        with self._lock:
+            if self._session_data is None:
+                self._session_data = self._read()
+
+            if not self._is_valid(self._session_data):
+                self._session_data = self._refresh()
+
+            return self._session_data["access_token"]
+
+    def invalidate(self, access_token: str) -> None:
+        """Drop the given access token after it has been rejected."""
+        with self._lock:
+            if self._session_data is not None and self._session_data.get("access_token") == access_token:
+                log("Access token rejected", xbmc.LOGWARNING)
+                self._session_data = {}
+
+    def reload(self) -> None:
+        """Read the stored access token again on next use."""
+        with self._lock:
+            self._session_data = None
+
+    def _is_valid(self, session_data: dict) -> bool:
+        """Check the access token exists and does not expire soon."""
+        if session_data.get("access_token") is None:
+            return False
+
+        return time.time() + self.refresh_margin < session_data.get("expires_at", 0)
+
+    def _refresh(self) -> dict:
+        """Refresh the access token, or wait for another process to refresh it."""
+
+        def load_valid() -> Optional[dict]:
+            session_data = self._read()
+            return session_data if self._is_valid(session_data) else None
+
+        return single_flight(f"token-{self._name}", self._fetch_and_store, load_valid)
+
+    def _fetch_and_store(self) -> dict:
+        """Fetch a new access token and store it with its issue time and expiry."""
+        from requests.exceptions import RequestException
+
+        log("Refreshing access token", xbmc.LOGDEBUG)
+
+        try:
+            content = self._fetch_token()
+        except RequestException as e:
+            raise AuthenticationRequired("Cannot fetch access token") from e
+
+        access_token = content.get("access_token")
+
+        if access_token is None:
+            raise AuthenticationRequired("No access token received")
+
+        issued_at = time.time()
+        expires_at = get_jwt_expiry(access_token)
+
+        if content.get("expires_in") is not None:
+            expires_at = issued_at + int(content.get("expires_in"))
+
+        if expires_at is None:
+            expires_at = issued_at + self.default_lifetime
+
+        session_data = {"access_token": access_token, "issued_at": issued_at, "expires_at": expires_at}
+        # Written right away, as other processes waiting for the refresh read it as soon as it completes
+        self._write(session_data)
+
+        return session_data
+
+    def _get_filepath(self) -> str:
+        """Get the path of the file storing the access token."""
+        return os.path.join(xbmcvfs.translatePath(get_addon_info("profile")), "tokens", f"{self._name}.json")
+
+    def _read(self) -> dict:
+        """Read the stored access token, an empty dict when there is none."""
+        try:
+            with open(self._get_filepath(), encoding="utf-8") as file:
+                session_data = json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+        return session_data if isinstance(session_data, dict) else {}
+
+    def _write(self, session_data: dict) -> None:
+        """Store the access token, replacing the previous one atomically."""
+        filepath = self._get_filepath()
+
+        try:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            fd, temp_filepath = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix=".tmp")
+
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as file:
+                    json.dump(session_data, file)
+                os.replace(temp_filepath, filepath)
+            except OSError:
+                os.remove(temp_filepath)
+                raise
+        except OSError as e:
+            log(f"Cannot store access token: {e}", xbmc.LOGWARNING)
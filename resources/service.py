@@ -0,0 +1,6 @@
+"""Service entry point."""
+
+from lib.service import run_service
+
+if __name__ == "__main__":
+    run_service()